@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Compare ORM to_dict serialization with the projected booking listing query.
+
+Usage: python benchmarks/bench_booking_listings.py [--sizes 10000 100000]
+
+Seeds a throwaway SQLite database for each size and reports, for both paths,
+the number of SQL statements issued and the wall time of building the
+/api/all-bookings payload.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def seed(db, User, Slot, Booking, bookings, users=500):
+    """Insert users, slots and bookings in bulk"""
+    now = datetime.utcnow()
+    db.session.execute(db.insert(User), [
+        {'name': f'Patient {i}', 'email': f'patient{i}@example.com',
+         'password_hash': 'x', 'role': 'patient', 'created_at': now}
+        for i in range(users)
+    ])
+    start = datetime(2020, 1, 1, 9)
+    db.session.execute(db.insert(Slot), [
+        {'start_at': start + timedelta(minutes=30 * i),
+         'end_at': start + timedelta(minutes=30 * (i + 1)), 'created_at': now}
+        for i in range(bookings)
+    ])
+    db.session.execute(db.insert(Booking), [
+        {'user_id': i % users + 1, 'slot_id': i + 1,
+         'created_at': now - timedelta(seconds=i)}
+        for i in range(bookings)
+    ])
+    db.session.commit()
+
+
+def measure(db, fn):
+    """Run fn once and return (statement count, seconds)"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return len(statements), elapsed
+
+
+def run(size):
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SLOT_SCHEDULER_ENABLED'] = '0'
+    os.environ['ARCHIVE_ENABLED'] = '0'
+    os.environ['DB_AUTO_INIT'] = '1'
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+    from main import app
+    from models.user import db, User, Slot, Booking
+
+    with app.app_context():
+        seed(db, User, Slot, Booking, size)
+
+        def orm_path():
+            bookings = Booking.query.order_by(Booking.created_at.desc()).all()
+            return [booking.to_dict() for booking in bookings]
+
+        def projected_path():
+            rows = db.session.execute(Booking.listing_query().order_by(Booking.created_at.desc()))
+            return [Booking.row_to_dict(row) for row in rows]
+
+        results = {}
+        for name, fn in (('orm_to_dict', orm_path), ('projected', projected_path)):
+            queries, elapsed = measure(db, fn)
+            results[name] = {'queries': queries, 'seconds': round(elapsed, 4)}
+            db.session.rollback()
+
+    os.remove(db_path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    # Each size runs in a fresh interpreter so the app binds to its own database
+    if len(args.sizes) > 1:
+        import subprocess
+        for size in args.sizes:
+            subprocess.run([sys.executable, __file__, '--sizes', str(size)], check=True)
+        return
+
+    size = args.sizes[0]
+    for name, result in run(size).items():
+        print(f"{size:>8} bookings  {name:<12} {result['queries']:>7} queries  {result['seconds']:>8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Measure /api/login throughput under concurrency for several hashing setups.
+
+Usage: python benchmarks/bench_login.py [--concurrency 16] [--requests 64]
+                                        [--workers 0 2 4] [--method pbkdf2:sha256:600000]
+
+Each PASSWORD_HASH_WORKERS value runs in a fresh interpreter against a
+throwaway SQLite database. Logins are issued from a thread pool through the
+Flask test client, the way threaded workers would serve them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def run(concurrency, requests):
+    os.environ.setdefault('DB_AUTO_INIT', '1')
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+    from main import app
+
+    client = app.test_client()
+    client.post('/api/register', json={'name': 'Bench', 'email': 'bench@example.com', 'password': 'bench'})
+
+    def login(_):
+        started = time.perf_counter()
+        response = app.test_client().post('/api/login', json={'email': 'bench@example.com', 'password': 'bench'})
+        return response.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(login, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    return {
+        'ok': sum(1 for status, _ in results if status == 200),
+        'requests_per_second': round(requests / elapsed, 2),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--method', default=os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run(args.concurrency, args.requests)))
+        return
+
+    for workers in args.workers:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+            SLOT_SCHEDULER_ENABLED='0',
+            PASSWORD_HASH_METHOD=args.method,
+            PASSWORD_HASH_WORKERS=str(workers),
+            PASSWORD_HASH_QUEUE=str(args.concurrency),
+            # One client logging in repeatedly would otherwise be rate limited
+            RATE_LIMIT_ENABLED='0',
+            CONCURRENCY_LIMIT_LOGIN='0',
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', '--concurrency', str(args.concurrency),
+             '--requests', str(args.requests)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"workers={workers:<3} {result['requests_per_second']:>8} req/s  "
+              f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  ok {result['ok']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Compare slot queries answered by the availability index with the database path.
+
+Usage: python benchmarks/bench_slot_index.py [--bookings 10000] [--runs 200] [--json]
+
+Fills a throwaway SQLite database with datagen.py (60 days of upcoming slots,
+30% booked), builds the index and reports the mean time of free-slot listings
+for 7 and 30 days, the first available slot and the taken-slot check, from
+memory and from the database. Set SLOT_MODE=virtual to measure that mode.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+
+
+def mean_us(fn, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return round((time.perf_counter() - started) / runs * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.update(SLOT_SCHEDULER_ENABLED='0', STARTUP_TIMING='0', REQUEST_LOG='0')
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+    import contextlib
+    from datagen import generate
+    from main import app, init_database
+    from models.user import db, Booking
+    from routes.slots import free_slots, first_free_slot
+    from utils.slot_index import availability_index
+
+    with app.app_context():
+        with contextlib.redirect_stdout(sys.stderr):
+            init_database()
+            generate(args.bookings, horizon_days=60)
+        availability_index.reconcile()
+        window = availability_index._window
+        booked_id = db.session.execute(
+            db.select(Booking.slot_id).order_by(Booking.id.desc()).limit(1)
+        ).scalar()
+
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cases = {
+            'free slots, 7 days': lambda: free_slots(today, today + timedelta(days=7)),
+            'free slots, 30 days': lambda: free_slots(today, today + timedelta(days=30)),
+            'first available': lambda: first_free_slot(datetime.now()),
+            'taken slot check': lambda: availability_index.is_booked(booked_id),
+        }
+        results = {}
+        for name, fn in cases.items():
+            results[name] = {'index_us': mean_us(fn, args.runs)}
+            if name == 'taken slot check':
+                continue
+            availability_index._window = None
+            try:
+                results[name]['database_us'] = mean_us(fn, max(1, args.runs // 10))
+            finally:
+                availability_index._window = window
+            db.session.rollback()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        database = f"{result['database_us']:>10.1f} us" if 'database_us' in result else ' ' * 13
+        print(f"{name:<22} index {result['index_us']:>8.1f} us   database {database}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Reader/writer concurrency on a shared SQLite file under different pragmas.
+
+Usage: python benchmarks/bench_sqlite_concurrency.py [--readers 4] [--writers 2] [--duration 10]
+
+Mimics several gunicorn workers sharing one database: writer processes book
+slots through /api/book while reader processes page through
+/api/all-bookings. Runs once with SQLite's defaults (rollback journal,
+synchronous=FULL) and once with the app defaults (WAL, synchronous=NORMAL),
+and reports completed requests and failures per role.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+CONFIGURATIONS = {
+    'rollback journal': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'},
+    'wal': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL'},
+}
+
+
+def _app():
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+    from main import app
+    return app
+
+
+def setup(writers):
+    """Create users and enough free slots; print tokens and slot ids as JSON"""
+    client = _app().test_client()
+    tokens = []
+    for i in range(writers):
+        email = f'writer{i}@example.com'
+        client.post('/api/register', json={'name': f'Writer {i}', 'email': email, 'password': 'bench'})
+        tokens.append(client.post('/api/login', json={'email': email, 'password': 'bench'}).json['token'])
+    admin = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'Passw0rd!'}).json['token']
+    slot_ids = [slot['id'] for slot in client.get('/api/slots?from=2031-01-01&to=2032-12-31').json]
+    print(json.dumps({'tokens': tokens, 'admin': admin, 'slots': slot_ids}))
+
+
+def worker(role, token, slot_ids, duration):
+    """Issue requests for `duration` seconds; print counts as JSON"""
+    client = _app().test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    done = failed = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        if role == 'writer':
+            if not slot_ids:
+                break
+            response = client.post('/api/book', json={'slotId': slot_ids.pop()}, headers=headers)
+            ok = response.status_code == 201
+        else:
+            response = client.get('/api/all-bookings?limit=100&include_total=0', headers=headers)
+            ok = response.status_code == 200
+        done += ok
+        failed += not ok
+    print(json.dumps({'role': role, 'done': done, 'failed': failed}))
+
+
+def run(name, settings, readers, writers, duration):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        SLOT_SCHEDULER_ENABLED='0',
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+        PASSWORD_HASH_WORKERS='0',
+        RATE_LIMIT_ENABLED='0',
+        **settings,
+    )
+    setup_output = subprocess.run(
+        [sys.executable, __file__, '--child', 'setup', '--writers', str(writers)],
+        env=dict(env, DB_AUTO_INIT='1'), capture_output=True, text=True, check=True
+    ).stdout
+    state = json.loads(setup_output.strip().splitlines()[-1])
+
+    processes = []
+    for i in range(writers):
+        # Each writer books its own disjoint share of the slots
+        share = state['slots'][i::writers]
+        processes.append(subprocess.Popen(
+            [sys.executable, __file__, '--child', 'writer', '--token', state['tokens'][i],
+             '--slots', json.dumps(share), '--duration', str(duration)],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ))
+    for _ in range(readers):
+        processes.append(subprocess.Popen(
+            [sys.executable, __file__, '--child', 'reader', '--token', state['admin'],
+             '--duration', str(duration)],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ))
+
+    totals = {'reader': [0, 0], 'writer': [0, 0]}
+    for process in processes:
+        result = json.loads(process.communicate()[0].strip().splitlines()[-1])
+        totals[result['role']][0] += result['done']
+        totals[result['role']][1] += result['failed']
+
+    print(f"{name:<18} reads {totals['reader'][0] / duration:>8.1f}/s ({totals['reader'][1]} failed)  "
+          f"writes {totals['writer'][0] / duration:>7.1f}/s ({totals['writer'][1]} failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--child', choices=['setup', 'reader', 'writer'], help=argparse.SUPPRESS)
+    parser.add_argument('--token', help=argparse.SUPPRESS)
+    parser.add_argument('--slots', default='[]', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'setup':
+        setup(args.writers)
+    elif args.child:
+        worker(args.child, args.token, json.loads(args.slots), args.duration)
+    else:
+        for name, settings in CONFIGURATIONS.items():
+            run(name, settings, args.readers, args.writers, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Worker cold-start time: importing the app and serving the first request.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--importtime 15] [--json]
+
+Each run starts a fresh interpreter, imports wsgi:app like a gunicorn worker
+and serves GET /api/health through the test client. Reports the median and
+worst of the process wall time, the import time and the per-stage timings
+recorded by utils/startup.py, once for the default lazy boot against an
+initialized database and once with DB_AUTO_INIT=1 (DDL and seeding at
+import, the old behaviour). --json prints machine-readable results so the
+numbers can be tracked over time; --importtime lists the slowest modules
+reported by `python -X importtime`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+
+def child():
+    """Import the app, serve one request and print the timings as JSON"""
+    started = time.perf_counter()
+    sys.path.insert(0, os.path.abspath(PROJECT_ROOT))
+    from wsgi import app
+    imported = time.perf_counter()
+    status = app.test_client().get('/api/health').status_code
+    served = time.perf_counter()
+
+    from utils.startup import startup_timer
+    print(json.dumps({
+        'import_ms': round((imported - started) * 1000, 1),
+        'first_request_ms': round((served - imported) * 1000, 1),
+        'stages_ms': startup_timer.as_dict(),
+        'status': status,
+    }))
+
+
+def run(env, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, __file__, '--child'],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        wall = (time.perf_counter() - started) * 1000
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['wall_ms'] = round(wall, 1)
+        samples.append(sample)
+
+    def summary(values):
+        return {'median': round(statistics.median(values), 1), 'max': round(max(values), 1)}
+
+    stages = samples[0]['stages_ms'].keys()
+    return {
+        'wall_ms': summary([s['wall_ms'] for s in samples]),
+        'import_ms': summary([s['import_ms'] for s in samples]),
+        'first_request_ms': summary([s['first_request_ms'] for s in samples]),
+        'stages_ms': {stage: summary([s['stages_ms'][stage] for s in samples]) for stage in stages},
+    }
+
+
+def importtime(env, top):
+    """Slowest modules by cumulative import time, in milliseconds"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import wsgi'],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative) / 1000, name.strip()))
+    modules.sort(reverse=True)
+    return [{'module': name, 'cumulative_ms': round(ms, 1)} for ms, name in modules[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='also list the N slowest imports')
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}",
+        SLOT_SCHEDULER_ENABLED='0',
+        STARTUP_TIMING='0',
+    )
+    # Deploy step, run once: later boots find the schema and admin in place
+    subprocess.run(['flask', '--app', 'wsgi', 'init-db'], cwd=PROJECT_ROOT, env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+
+    results = {
+        'lazy': run(dict(env, DB_AUTO_INIT='0'), args.runs),
+        'init at import': run(dict(env, DB_AUTO_INIT='1'), args.runs),
+    }
+    if args.importtime:
+        results['slowest_imports'] = importtime(env, args.importtime)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name in ('lazy', 'init at import'):
+        result = results[name]
+        stages = ', '.join(f"{stage} {value['median']}" for stage, value in result['stages_ms'].items())
+        print(f"{name:<15} wall {result['wall_ms']['median']:>7.1f} ms (max {result['wall_ms']['max']:.1f})  "
+              f"import {result['import_ms']['median']:>6.1f} ms  first request {result['first_request_ms']['median']:>5.1f} ms  "
+              f"[{stages}]")
+    for module in results.get('slowest_imports', []):
+        print(f"  {module['cumulative_ms']:>8.1f} ms  {module['module']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""Replay realistic request mixes against a seeded database and report JSON.
+
+Usage:
+  python benchmarks/bench_suite.py [--bookings 10000] [--seed 42] [--output result.json]
+  python benchmarks/bench_suite.py --target gunicorn --threads 8
+  python benchmarks/bench_suite.py --database-url postgresql://localhost/bench
+  python benchmarks/bench_suite.py --baseline baseline.json [--tolerance 0.25]
+
+Without --database-url a throwaway SQLite database is filled by datagen.py
+with --bookings/--seed; an existing --database-url must have been filled by
+datagen.py already. Scenarios (--scenarios, default all):
+
+  dashboard     patients load GET /api/slots and GET /api/my-bookings
+  booking_rush  patients race for the first --rush-slots free slots (201 or 409)
+  admin         GET /api/all-bookings pages (limit=100, following next_cursor)
+                and per-patient filtered listings
+  mixed         75% dashboard, 15% bookings on random free slots, 10% admin
+
+Each scenario runs --ops operations spread over --concurrency threads, each
+with its own seeded RNG. The target is the Flask test client in this process
+or a local gunicorn (gthread, --workers x --threads). Rate limits and the
+slot scheduler are turned off. Per scenario the report has throughput,
+p50/p95/p99 latency overall and per endpoint, non-2xx/4xx surprises, and the
+average database queries per request per route, scraped from /api/metrics
+(only with a single server process).
+
+With --baseline the run is compared to an earlier --output file and exits 1
+when throughput drops, p50/p95 latency rises by more than --tolerance (and
+--min-ms), queries per request grow, or new errors appear.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+PROJECT_ROOT = os.path.join(BENCH_DIR, '..', '..')
+
+# Applied to the app under test, in process or under gunicorn
+SERVER_ENV = {
+    'RATE_LIMIT_ENABLED': '0',
+    'CONCURRENCY_LIMIT_LOGIN': '0',
+    'CONCURRENCY_LIMIT_REGISTER': '0',
+    'CONCURRENCY_LIMIT_BOOK': '0',
+    'SLOT_SCHEDULER_ENABLED': '0',
+    # datagen's history is years old; keep it in place while measuring
+    'ARCHIVE_ENABLED': '0',
+    'STARTUP_TIMING': '0',
+    'REQUEST_LOG': '0',
+    # /api/metrics is off without a token; the suite scrapes it for query counts
+    'METRICS_TOKEN': 'bench',
+    'FLASK_ENV': 'production',
+}
+
+SCENARIOS = ('dashboard', 'booking_rush', 'admin', 'mixed')
+
+METRIC_LINE = re.compile(r'^http_request_db_queries_(sum|count)\{(.*)\} (\S+)$')
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+class TestClientTransport:
+    """Requests through the Flask test client, one client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, token=None, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = client.open(path, method=method, headers=headers, json=body)
+        return response.status_code, response.get_data()
+
+
+class HTTPTransport:
+    """Keep-alive HTTP connections to a running server, one per thread"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, token=None, body=None):
+        import http.client
+
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                connection.request(method, path, body=data, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # The server may have closed an idle keep-alive connection
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+class Session:
+    """One simulated client: a seeded RNG and the samples it records"""
+
+    def __init__(self, transport, state, rng, token):
+        self.transport = transport
+        self.state = state
+        self.rng = rng
+        self.token = token
+        self.samples = []
+
+    def call(self, name, method, path, token=None, body=None, expected=(200,)):
+        started = time.perf_counter()
+        try:
+            status, raw = self.transport.request(method, path, token or self.token, body)
+        except (OSError, ValueError):
+            status, raw = 0, b''
+        self.samples.append((name, time.perf_counter() - started, status, status in expected))
+        return status, raw
+
+
+def dashboard(session):
+    session.call('GET /api/slots', 'GET', '/api/slots')
+    session.call('GET /api/my-bookings', 'GET', '/api/my-bookings')
+
+
+def booking_rush(session):
+    slot_id = session.rng.choice(session.state['hot_slots'])
+    session.call('POST /api/book', 'POST', '/api/book', body={'slotId': slot_id}, expected=(201, 409))
+
+
+def book_any(session):
+    slot_id = session.rng.choice(session.state['free_slots'])
+    session.call('POST /api/book', 'POST', '/api/book', body={'slotId': slot_id}, expected=(201, 409))
+
+
+def admin(session):
+    token = session.state['admin_token']
+    status, raw = session.call('GET /api/all-bookings', 'GET', '/api/all-bookings?limit=100', token)
+    cursor = json.loads(raw).get('next_cursor') if status == 200 else None
+    for _ in range(session.rng.randint(0, 2)):
+        if not cursor:
+            break
+        status, raw = session.call('GET /api/all-bookings (next page)', 'GET',
+                                   f'/api/all-bookings?limit=100&include_total=0&cursor={cursor}', token)
+        cursor = json.loads(raw).get('next_cursor') if status == 200 else None
+    if session.rng.random() < 0.3:
+        user_id = session.rng.choice(session.state['user_ids'])
+        session.call('GET /api/all-bookings (user)', 'GET',
+                     f'/api/all-bookings?limit=100&user_id={user_id}', token)
+
+
+def mixed(session):
+    roll = session.rng.random()
+    if roll < 0.75:
+        dashboard(session)
+    elif roll < 0.90:
+        book_any(session)
+    else:
+        admin(session)
+
+
+OPERATIONS = {'dashboard': dashboard, 'booking_rush': booking_rush, 'admin': admin, 'mixed': mixed}
+
+
+def _percentile(values, p):
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2) if values else None
+
+
+def _latency(samples):
+    latencies = sorted(sample[1] for sample in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if not sample[3]),
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+        'p99_ms': _percentile(latencies, 0.99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def _query_counts(transport):
+    """(method route) -> [queries, requests] from the /api/metrics histograms"""
+    status, raw = transport.request('GET', '/api/metrics', token=SERVER_ENV['METRICS_TOKEN'])
+    if status != 200:
+        return {}
+    counts = {}
+    for line in raw.decode().splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            labels = dict(LABEL.findall(match.group(2)))
+            key = f"{labels.get('method')} {labels.get('route')}"
+            counts.setdefault(key, [0.0, 0.0])[0 if match.group(1) == 'sum' else 1] = float(match.group(3))
+    return counts
+
+
+def run_scenario(transport, name, state, ops, concurrency, seed, tokens, count_queries):
+    before = _query_counts(transport) if count_queries else {}
+    sessions = [
+        Session(transport, state, random.Random(f'{seed}-{name}-{i}'), tokens[i % len(tokens)])
+        for i in range(concurrency)
+    ]
+    operation = OPERATIONS[name]
+
+    def work(session, count):
+        for _ in range(count):
+            operation(session)
+
+    threads = [
+        threading.Thread(target=work, args=(session, ops // concurrency + (i < ops % concurrency)))
+        for i, session in enumerate(sessions)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for session in sessions for sample in session.samples]
+    result = _latency(samples)
+    result['seconds'] = round(elapsed, 3)
+    result['throughput_rps'] = round(len(samples) / elapsed, 1) if elapsed else None
+    result['statuses'] = {}
+    for sample in samples:
+        result['statuses'][str(sample[2])] = result['statuses'].get(str(sample[2]), 0) + 1
+    result['endpoints'] = {
+        endpoint: _latency([sample for sample in samples if sample[0] == endpoint])
+        for endpoint in sorted({sample[0] for sample in samples})
+    }
+    if count_queries:
+        after = _query_counts(transport)
+        result['queries_per_request'] = {}
+        for key, (queries, requests) in sorted(after.items()):
+            queries -= before.get(key, [0, 0])[0]
+            requests -= before.get(key, [0, 0])[1]
+            if requests and not key.endswith(' /api/metrics'):
+                result['queries_per_request'][key] = round(queries / requests, 2)
+    return result
+
+
+def _login(transport, email, password):
+    status, raw = transport.request('POST', '/api/login', body={'email': email, 'password': password})
+    if status != 200:
+        raise SystemExit(f'Login as {email} failed with {status}: {raw[:200]!r}')
+    return json.loads(raw)['token']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(transport, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if transport.request('GET', '/api/health')[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError('The server did not start')
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, tolerance, min_ms):
+    """List the ways `result` is worse than `baseline`"""
+    regressions = []
+    for scenario, current in result['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(scenario)
+        if not base:
+            continue
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{scenario}: throughput {current['throughput_rps']} req/s, "
+                               f"baseline {base['throughput_rps']}")
+        if current['errors'] > base['errors']:
+            regressions.append(f"{scenario}: {current['errors']} errors, baseline {base['errors']}")
+        for endpoint, stats in current['endpoints'].items():
+            base_stats = base['endpoints'].get(endpoint)
+            if not base_stats:
+                continue
+            for key in ('p50_ms', 'p95_ms'):
+                now, before = stats[key], base_stats[key]
+                if now > before * (1 + tolerance) and now - before > min_ms:
+                    regressions.append(f"{scenario}: {endpoint} {key} {now}, baseline {before}")
+        for route, queries in current.get('queries_per_request', {}).items():
+            before = base.get('queries_per_request', {}).get(route)
+            if before is not None and queries - before >= 1 and queries > before * (1 + tolerance):
+                regressions.append(f"{scenario}: {route} {queries} queries per request, baseline {before}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--bookings', type=int, default=10000, help='data set size when generating')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='an existing database filled by datagen.py')
+    parser.add_argument('--target', choices=('testclient', 'gunicorn'), default='testclient')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--ops', type=int, default=400, help='operations per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='unrecorded dashboard/admin operations first')
+    parser.add_argument('--rush-slots', type=int, default=16, help='free slots fought over in booking_rush')
+    parser.add_argument('--output', help='also write the JSON report here')
+    parser.add_argument('--baseline', help='report from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='ignore latency changes smaller than this')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.update(SERVER_ENV, DATABASE_URL=database_url)
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+    import contextlib
+    from datagen import generate, patient_email, PASSWORD
+    from main import app, init_database
+    from models.user import db, User, Slot, Booking
+
+    with app.app_context():
+        if not args.database_url:
+            with contextlib.redirect_stdout(sys.stderr):
+                init_database()
+                generate(args.bookings, seed=args.seed)
+        patients = db.session.execute(
+            db.select(User.id).where(User.role == 'patient').order_by(User.id)
+        ).scalars().all()
+        data = {
+            'users': len(patients),
+            'slots': db.session.execute(db.select(db.func.count(Slot.id))).scalar(),
+            'bookings': db.session.execute(db.select(db.func.count(Booking.id))).scalar(),
+        }
+        dialect = db.engine.dialect.name
+        db.session.remove()
+    if not patients:
+        raise SystemExit('No patients found; fill the database with datagen.py first')
+
+    server = None
+    if args.target == 'gunicorn':
+        port = _free_port()
+        server = subprocess.Popen(
+            ['gunicorn', 'wsgi:app', '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+             '--threads', str(args.threads), '--worker-class', 'gthread', '--log-level', 'warning'],
+            cwd=PROJECT_ROOT, env=dict(os.environ), stdout=subprocess.DEVNULL
+        )
+        transport = HTTPTransport(f'http://127.0.0.1:{port}')
+    else:
+        transport = TestClientTransport(app)
+
+    try:
+        _wait_ready(transport)
+        rng = random.Random(args.seed)
+        # datagen names patients by their insertion order
+        tokens = [_login(transport, patient_email(index), PASSWORD)
+                  for index in rng.sample(range(len(patients)), min(args.concurrency, len(patients)))]
+        today = datetime.now().date()
+        status, raw = transport.request('GET', f'/api/slots?from={today}&to={today + timedelta(days=30)}')
+        free_slots = [slot['id'] for slot in json.loads(raw)] if status == 200 else []
+        if not free_slots:
+            raise SystemExit('No free slots to book; generate with a horizon')
+        state = {
+            'admin_token': _login(transport, 'admin@example.com', 'Passw0rd!'),
+            'user_ids': patients,
+            'hot_slots': free_slots[:args.rush_slots],
+            'free_slots': free_slots[args.rush_slots:] or free_slots,
+        }
+        # Single-process servers only: with several workers each keeps its own metrics
+        count_queries = args.target == 'testclient' or args.workers == 1
+
+        for name in ('dashboard', 'admin'):
+            run_scenario(transport, name, state, args.warmup, 1, args.seed, tokens, False)
+
+        result = {
+            'meta': {
+                'revision': _git_revision(),
+                'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'database': dialect,
+                'target': args.target,
+                'workers': args.workers if server else None,
+                'threads': args.threads if server else None,
+                'concurrency': args.concurrency,
+                'ops': args.ops,
+                'seed': args.seed,
+                'data': data,
+            },
+            'scenarios': {},
+        }
+        for name in args.scenarios:
+            result['scenarios'][name] = run_scenario(
+                transport, name, state, args.ops, args.concurrency, args.seed, tokens, count_queries
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('target', 'concurrency', 'ops', 'seed', 'data'):
+            if baseline.get('meta', {}).get(key) != result['meta'][key]:
+                print(f"Warning: baseline {key} differs ({baseline.get('meta', {}).get(key)} "
+                      f"vs {result['meta'][key]})", file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance, args.min_ms)
+        result['regressions'] = regressions
+
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    if regressions:
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
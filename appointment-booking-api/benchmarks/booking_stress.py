@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Fire N parallel bookings at one slot and check that exactly one succeeds.
+
+Usage: python benchmarks/booking_stress.py [--clients 50] [--rounds 5]
+                                           [--database-url postgresql://...]
+
+Each client is a separate patient with its own token. For every round a
+fresh slot is picked and all clients book it at once; the script exits
+non-zero if any round ends with anything other than one 201 and N-1 409s,
+and reports p50/p99 booking latency across rounds.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+    os.environ['SLOT_SCHEDULER_ENABLED'] = '0'
+    os.environ['DB_AUTO_INIT'] = '1'
+    # Measure the booking path itself, not admission control
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    os.environ['CONCURRENCY_LIMIT_BOOK'] = '0'
+    os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+    from main import app
+
+    client = app.test_client()
+    tokens = []
+    for i in range(args.clients):
+        email = f'stress{i}@example.com'
+        client.post('/api/register', json={'name': f'Stress {i}', 'email': email, 'password': 'stress'})
+        tokens.append(client.post('/api/login', json={'email': email, 'password': 'stress'}).json['token'])
+
+    slots = client.get('/api/slots?from=2031-01-01&to=2031-01-07').json
+    if len(slots) < args.rounds:
+        sys.exit('Not enough free slots for the requested number of rounds')
+
+    failures = 0
+    latencies = []
+    for round_number in range(args.rounds):
+        slot_id = slots[round_number]['id']
+        barrier = threading.Barrier(args.clients)
+
+        def book(token):
+            barrier.wait()
+            started = time.perf_counter()
+            response = app.test_client().post(
+                '/api/book', json={'slotId': slot_id},
+                headers={'Authorization': f'Bearer {token}'}
+            )
+            return response.status_code, time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            results = list(pool.map(book, tokens))
+
+        statuses = Counter(status for status, _ in results)
+        latencies.extend(latency for _, latency in results)
+        ok = statuses == Counter({201: 1, 409: args.clients - 1})
+        failures += not ok
+        print(f"round {round_number + 1}: slot {slot_id} -> {dict(statuses)} {'OK' if ok else 'FAIL'}")
+
+    latencies.sort()
+    print(f"p50 {statistics.median(latencies) * 1000:.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms  "
+          f"over {len(latencies)} bookings")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Fill a database with a reproducible synthetic clinic: users, slots and bookings.
+
+Usage:
+  python benchmarks/datagen.py --bookings 100000 [--database-url URL] [--seed 42]
+
+Without --database-url a throwaway SQLite file is created and its URL printed.
+The same --seed produces the same rows, with dates relative to today. Layout:
+
+- `--users` patients (default one per ten bookings, at least 100) named
+  patient<N>@example.com, all sharing the password `bench-password`, plus the
+  default admin user
+- booked history: one fully booked 9:00-17:00 slot grid per day, going back
+  from yesterday for as many days as the bookings need
+- the next `--horizon-days` days of materialized slots, `--future-booked` of
+  them already booked, so dashboards and booking rushes have free slots
+
+Booking owners are skewed so a few patients have many bookings, like real
+frequent visitors. Rows are inserted with bulk executemany in batches of
+`--batch-size`. Prints a JSON summary.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+PASSWORD = 'bench-password'
+
+
+def patient_email(index):
+    return f'patient{index}@example.com'
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(db, model, rows, batch_size):
+    count = 0
+    for batch in _batches(rows, batch_size):
+        db.session.execute(db.insert(model), batch)
+        count += len(batch)
+    db.session.commit()
+    return count
+
+
+def generate(bookings, users=None, seed=42, horizon_days=14, future_booked=0.3, batch_size=5000):
+    """Insert the synthetic data set; needs an app context on a migrated database"""
+    from models.user import db, User, Slot, Booking
+    from utils.passwords import hash_password
+    from utils.slots import iter_slot_starts, SLOT_MINUTES
+
+    if db.session.execute(db.select(db.func.count(Booking.id))).scalar():
+        raise SystemExit('The database already has bookings; generate into an empty one')
+
+    rng = random.Random(seed)
+    users = users or max(100, bookings // 10)
+    started = time.perf_counter()
+    now = datetime.utcnow().replace(microsecond=0)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    slot_length = timedelta(minutes=SLOT_MINUTES)
+
+    # Hash once: every patient shares the password, and hashing is deliberately slow
+    password_hash = hash_password(PASSWORD)
+    _insert(db, User, (
+        {'name': f'Patient {i}', 'email': patient_email(i), 'password_hash': password_hash,
+         'role': 'patient', 'created_at': now - timedelta(days=rng.randint(0, 3650))}
+        for i in range(users)
+    ), batch_size)
+    user_ids = db.session.execute(
+        db.select(User.id).where(User.role == 'patient').order_by(User.id)
+    ).scalars().all()
+
+    # Future slots, some of them booked
+    future_end = today + timedelta(days=horizon_days)
+    future_starts = list(iter_slot_starts(today, future_end))
+    future_count = min(len(future_starts), int(len(future_starts) * future_booked), bookings)
+    booked_future = set(rng.sample(range(len(future_starts)), future_count))
+
+    # Fully booked history for the rest of the bookings
+    past_count = bookings - future_count
+    per_day = len(list(iter_slot_starts(today, today)))
+    past_days = math.ceil(past_count / per_day)
+    past_starts = list(iter_slot_starts(today - timedelta(days=past_days), today - timedelta(days=1)))
+    past_starts = past_starts[len(past_starts) - past_count:] if past_count else []
+
+    all_starts = past_starts + future_starts
+    slot_count = _insert(db, Slot, (
+        {'start_at': start, 'end_at': start + slot_length, 'created_at': now}
+        for start in all_starts
+    ), batch_size)
+    slot_ids = db.session.execute(
+        db.select(Slot.id, Slot.start_at).where(Slot.start_at >= all_starts[0]).order_by(Slot.start_at)
+    ).all()
+
+    booked = list(slot_ids[:len(past_starts)])
+    booked += [slot_ids[len(past_starts) + i] for i in sorted(booked_future)]
+
+    def booking_rows():
+        for slot_id, start_at in booked:
+            # Squaring skews ownership towards the first patients
+            owner = user_ids[int(len(user_ids) * rng.random() ** 2)]
+            lead_time = timedelta(seconds=rng.randint(3600, 30 * 86400))
+            yield {'user_id': owner, 'slot_id': slot_id,
+                   'created_at': min(start_at - lead_time, now)}
+
+    booking_count = _insert(db, Booking, booking_rows(), batch_size)
+
+    return {
+        'seed': seed,
+        'users': len(user_ids),
+        'slots': slot_count,
+        'bookings': booking_count,
+        'free_future_slots': len(future_starts) - future_count,
+        'history_days': past_days,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=10000)
+    parser.add_argument('--users', type=int, help='patients to create (default bookings / 10, at least 100)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--horizon-days', type=int, default=14)
+    parser.add_argument('--future-booked', type=float, default=0.3,
+                        help='fraction of the upcoming slots that are already booked')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--database-url', help='e.g. postgresql://localhost/bench (default: a new SQLite file)')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['SLOT_SCHEDULER_ENABLED'] = '0'
+    os.environ.setdefault('STARTUP_TIMING', '0')
+    sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+    from main import app, init_database
+
+    with app.app_context():
+        init_database()
+        summary = generate(args.bookings, args.users, args.seed, args.horizon_days,
+                           args.future_booked, args.batch_size)
+    summary['database_url'] = database_url
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
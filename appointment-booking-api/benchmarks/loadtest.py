@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""HTTP load test with many concurrent keep-alive clients.
+
+Usage:
+  python benchmarks/loadtest.py --url http://localhost:5000 [--concurrency 500] [--duration 15]
+  python benchmarks/loadtest.py --compare [--concurrency 500] [--duration 15]
+
+--compare starts the app as deployed (uvicorn asgi:app, ASGI_THREADS request
+threads) and under gunicorn (wsgi:app, gthread workers with as many threads)
+against the same throwaway SQLite database and reports requests/s and
+latency percentiles for each. Requests cycle through
+/api/health, /api/slots and a ranged /api/slots query.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+# Request threads per worker for both servers; same setting and default as asgi.py
+SERVER_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+PATHS = ['/api/health', '/api/slots', '/api/slots?from=2031-01-01&to=2031-01-14']
+
+
+async def _request(reader, writer, host, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    keep_alive = True
+    for line in head.split(b'\r\n'):
+        lowered = line.lower()
+        if lowered.startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+        elif lowered.startswith(b'connection:') and b'close' in lowered:
+            keep_alive = False
+    if length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _client(host, port, deadline, latencies, errors, offset):
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            status, keep_alive = await _request(reader, writer, host, PATHS[index % len(PATHS)])
+            latencies.append(time.perf_counter() - started)
+            if status >= 500:
+                errors.append(status)
+            if not keep_alive:
+                # Sync workers close after every response; reconnect
+                writer.close()
+                reader = writer = None
+            index += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append('connection')
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def _run(url, concurrency, duration):
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _client(parts.hostname, parts.port or 80, deadline, latencies, errors, i)
+        for i in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+def run(url, concurrency, duration):
+    return asyncio.run(_run(url, concurrency, duration))
+
+
+def _wait_ready(url, timeout=30):
+    import urllib.request
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url + '/api/health', timeout=1)
+            return
+        except OSError:
+            time.sleep(0.3)
+    raise RuntimeError(f'Server at {url} did not start')
+
+
+def compare(concurrency, duration, workers, threads=SERVER_THREADS):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}",
+        FLASK_ENV='production',
+        ASGI_THREADS=str(threads),
+    )
+    # Both servers get a connection per request thread, as asgi.py sets up
+    env.setdefault('DB_POOL_SIZE', str(threads))
+    servers = {
+        'asgi (uvicorn, deployed)': ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', '5302',
+                                     '--workers', str(workers), '--log-level', 'warning', '--no-access-log'],
+        'wsgi (gunicorn gthread)': ['gunicorn', 'wsgi:app', '--bind', '127.0.0.1:5301',
+                                    '--workers', str(workers), '--worker-class', 'gthread',
+                                    '--threads', str(threads), '--log-level', 'warning'],
+    }
+    subprocess.run(['flask', '--app', 'wsgi', 'init-db'], cwd=PROJECT_ROOT, env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+    results = {}
+    for name, command in servers.items():
+        port = command[command.index('--bind') + 1].split(':')[1] if '--bind' in command else command[command.index('--port') + 1]
+        url = f'http://127.0.0.1:{port}'
+        process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_ready(url)
+            results[name] = run(url, concurrency, duration)
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes for --compare')
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS,
+                        help='request threads per worker for --compare (default: ASGI_THREADS)')
+    args = parser.parse_args()
+
+    if args.compare:
+        results = compare(args.concurrency, args.duration, args.workers, args.threads)
+    elif args.url:
+        results = {args.url: run(args.url, args.concurrency, args.duration)}
+    else:
+        parser.error('pass --url or --compare')
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
 import os
 import sys
 
-from flask import Flask, send_from_directory, request
+from utils.startup import startup_timer
+import click
+from flask import Flask
 try:
     from flask_cors import CORS
 except ImportError:
@@ -16,51 +18,35 @@ except ImportError:
         return app
 from models.user import db, User
 from routes.auth import auth_bp
-from routes.slots import slots_bp
+from routes.slots import slots_bp, live_updates_available
 from routes.bookings import bookings_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Enable CORS for all routes
-CORS(app, origins="*")
-
-# Add request logging for debugging
-@app.before_request
-def log_request_info():
-    print(f"Request: {request.method} {request.url}")
-
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api')
-app.register_blueprint(slots_bp, url_prefix='/api')
-app.register_blueprint(bookings_bp, url_prefix='/api')
-
-# Health check route
-@app.route('/api/health')
-def health_check():
-    return {"status": "OK", "message": "API is running"}
+from routes.metrics import metrics_bp
+from utils.scheduler import SlotHorizonScheduler, extend_horizon, SLOT_HORIZON_DAYS
+from utils.slots import VIRTUAL_SLOTS, prune_unbooked_slots
+from utils.slot_index import availability_index, SLOT_INDEX_ENABLED
+from utils.archive import ArchiveScheduler, ARCHIVE_ENABLED, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from utils.database import configure_database
+from utils.metrics import init_metrics
+from utils.static_files import StaticManifest, compress_static
+
+startup_timer.mark('imports')
+
+# Create the tables and admin user while building the app. Off by default:
+# run `flask --app wsgi init-db` once per deploy instead, so workers do no
+# DDL at boot and do not race each other on it.
+DB_AUTO_INIT = os.environ.get('DB_AUTO_INIT', '0') == '1'
 
 # Database configuration
 # Create database directory if it doesn't exist
 db_dir = os.path.join(os.path.dirname(__file__), 'database')
 os.makedirs(db_dir, exist_ok=True)
 
-# Use environment variable for database URL if available, otherwise use SQLite
-database_url = os.environ.get('DATABASE_URL')
-if database_url:
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(db_dir, 'app.db')}"
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
 def seed_admin_user():
     """Seed admin user if it doesn't exist"""
     try:
         admin_email = 'admin@example.com'
         admin_password = 'Passw0rd!'
-        
+
         existing_admin = User.query.filter_by(email=admin_email).first()
         if not existing_admin:
             admin_user = User(
@@ -77,51 +63,188 @@ def seed_admin_user():
     except Exception as e:
         print(f"Error seeding admin user: {e}")
 
-# Initialize database on startup
 def init_database():
-    """Initialize database tables and seed data"""
+    """Apply schema migrations and seed data (needs an app context).
+
+    Returns False if a migration failed.
+    """
+    from utils.migrations import run_migrations
     try:
-        with app.app_context():
-            db.create_all()
-            seed_admin_user()
-            print("Database initialized successfully")
+        run_migrations()
+        seed_admin_user()
+        print("Database initialized successfully")
+        return True
     except Exception as e:
         print(f"Database initialization error: {e}")
-
-# Call database initialization
-init_database()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    """Serve React frontend files"""
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return {"error": "Static folder not configured"}, 404
-
-    # If path is empty, serve index.html
-    if path == "":
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+        return False
+
+def register_commands(app):
+    """Attach the deploy and maintenance CLI commands"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Apply schema migrations and seed the admin user; run once per deploy"""
+        if not init_database():
+            sys.exit(1)
+
+    @app.cli.command('seed')
+    def seed_command():
+        """Create the default admin user if it doesn't exist"""
+        seed_admin_user()
+
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Apply pending schema migrations"""
+        from utils.migrations import run_migrations, MigrationError, MIGRATIONS
+        try:
+            applied = run_migrations()
+        except MigrationError as e:
+            print(e)
+            sys.exit(1)
+        print(f"Applied {len(applied)} migrations; schema is at version {MIGRATIONS[-1][0]}")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail if a hot query's plan falls back to a full table scan"""
+        from utils.query_plans import check_query_plans
+        failures = check_query_plans()
+        if failures:
+            for name, detail in failures:
+                print(f"FULL SCAN in {name}: {detail}")
+            sys.exit(1)
+        print("All hot queries use indexes")
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Delete stored Idempotency-Key responses older than IDEMPOTENCY_TTL"""
+        from utils.idempotency import purge_expired_keys
+        deleted = purge_expired_keys()
+        db.session.commit()
+        print(f"Deleted {deleted} expired idempotency keys")
+
+    @app.cli.command('compress-static')
+    def compress_static_command():
+        """Write .gz/.br copies of the built frontend files for the static server"""
+        written = compress_static(app.static_folder)
+        print(f"Wrote {written} compressed files")
+
+    @app.cli.command('materialize-slots')
+    @click.option('--days', default=SLOT_HORIZON_DAYS, show_default=True, help='Days ahead to materialize')
+    def materialize_slots_command(days):
+        """Materialize appointment slots from today through the given horizon"""
+        created = extend_horizon(days)
+        print(f"Materialized {created} slots for the next {days} days")
+
+    @app.cli.command('archive')
+    @click.option('--days', default=ARCHIVE_AFTER_DAYS, show_default=True,
+                  help='Archive bookings of slots that started more than this many days ago')
+    @click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True, help='Rows moved per transaction')
+    def archive_command(days, batch_size):
+        """Move past bookings to bookings_archive and delete past free slots"""
+        from utils.archive import archive_past
+        archived, deleted = archive_past(days, batch_size)
+        print(f"Archived {archived} bookings and deleted {deleted} free slots older than {days} days")
+
+    @app.cli.command('virtualize-slots')
+    def virtualize_slots_command():
+        """Delete unbooked Slot rows when switching to SLOT_MODE=virtual"""
+        deleted = prune_unbooked_slots()
+        db.session.commit()
+        print(f"Deleted {deleted} unbooked slots")
+
+def create_app():
+    """Build the Flask app; does not touch the database unless DB_AUTO_INIT=1"""
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+
+    # Enable CORS for all routes
+    CORS(app, origins="*")
+
+    # Latency, query and status metrics plus a buffered access log line per
+    # request (see utils/metrics.py)
+    init_metrics(app)
+
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(slots_bp, url_prefix='/api')
+    app.register_blueprint(bookings_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+
+    # Health check route
+    @app.route('/api/health')
+    def health_check():
+        # live_updates tells the dashboard whether to open /api/slots/stream
+        return {"status": "OK", "message": "API is running", "live_updates": live_updates_available()}
+
+    # DATABASE_URL if set, otherwise SQLite; pragmas and pooling come from the
+    # SQLITE_* / DB_* environment variables (see utils/database.py)
+    configure_database(app, f"sqlite:///{os.path.join(db_dir, 'app.db')}")
+    db.init_app(app)
+
+    register_commands(app)
+
+    if DB_AUTO_INIT:
+        with app.app_context():
+            init_database()
+
+    # Keep slots materialized ahead so GET /api/slots stays read-only. The
+    # job starts with the first request, so importing the app (CLI commands,
+    # gunicorn --preload) starts no threads.
+    if not VIRTUAL_SLOTS and os.environ.get('SLOT_SCHEDULER_ENABLED', '1') == '1':
+        slot_scheduler = app.extensions['slot_scheduler'] = SlotHorizonScheduler(app)
+
+        @app.before_request
+        def start_slot_scheduler():
+            slot_scheduler.start()
+
+    # Move bookings older than ARCHIVE_AFTER_DAYS to bookings_archive so the
+    # hot tables and their indexes stay sized to the active window
+    if ARCHIVE_ENABLED:
+        archive_scheduler = app.extensions['archive_scheduler'] = ArchiveScheduler(app)
+
+        @app.before_request
+        def start_archive_scheduler():
+            archive_scheduler.start()
+
+    # Per-day availability bitmasks that answer slot listings and taken-slot
+    # checks from memory; built in the background from the first request on
+    if SLOT_INDEX_ENABLED:
+        slot_index = app.extensions['slot_index'] = availability_index
+
+        @app.before_request
+        def start_slot_index():
+            slot_index.start(app)
+
+    # Frontend files are indexed once here; requests are answered from the
+    # in-memory manifest without touching the filesystem
+    static_manifest = app.extensions['static_manifest'] = StaticManifest(app.static_folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        """Serve React frontend files"""
+        if app.static_folder is None:
+            return {"error": "Static folder not configured"}, 404
+
+        static_file = static_manifest.get(path) if path else None
+        if static_file is None:
+            # Empty path and client-side routes get index.html
+            static_file = static_manifest.get('index.html')
+        if static_file is None:
             return {"error": "Frontend not built. Run 'npm run build' in frontend directory."}, 404
-    
-    # Check if the requested file exists
-    file_path = os.path.join(static_folder_path, path)
-    if os.path.exists(file_path):
-        return send_from_directory(static_folder_path, path)
-    
-    # For client-side routing, serve index.html
-    index_path = os.path.join(static_folder_path, 'index.html')
-    if os.path.exists(index_path):
-        return send_from_directory(static_folder_path, 'index.html')
-    else:
-        return {"error": "Frontend not built. Run 'npm run build' in frontend directory."}, 404
+        return static_file.response()
+
+    return app
+
+app = create_app()
+startup_timer.mark('create_app')
+startup_timer.report()
 
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') != 'production'
+    # The development server sets up its own database
+    with app.app_context():
+        init_database()
     app.run(host='0.0.0.0', port=port, debug=debug)
-
@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.passwords import hash_password, verify_password, needs_rehash
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -19,11 +19,15 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set the password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check if the provided password matches the hash"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash uses outdated algorithm or cost parameters"""
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert user object to dictionary"""
@@ -39,7 +43,7 @@ class Slot(db.Model):
     __tablename__ = 'slots'
     
     id = db.Column(db.Integer, primary_key=True)
-    start_at = db.Column(db.DateTime, nullable=False)
+    start_at = db.Column(db.DateTime, nullable=False, unique=True, index=True)
     end_at = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -58,6 +62,12 @@ class Slot(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Keyset pagination over the admin listing orders by (created_at, id)
+        db.Index('ix_bookings_created_at_id', 'created_at', 'id'),
+        # "My bookings" filters on user_id and sorts on created_at
+        db.Index('ix_bookings_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -75,4 +85,88 @@ class Booking(db.Model):
             'slot_start': self.slot.start_at.isoformat() if self.slot and self.slot.start_at else None,
             'slot_end': self.slot.end_at.isoformat() if self.slot and self.slot.end_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    def listing_query():
+        """Column-projected select for booking listings (user and slot joined in)"""
+        return db.select(
+            Booking.id,
+            Booking.user_id,
+            Booking.slot_id,
+            User.name,
+            User.email,
+            Slot.start_at,
+            Slot.end_at,
+            Booking.created_at
+        ).outerjoin(User, User.id == Booking.user_id).outerjoin(Slot, Slot.id == Booking.slot_id)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Convert a listing_query row to the same dictionary as to_dict; columns
+        after the first eight are ignored"""
+        booking_id, user_id, slot_id, user_name, user_email, slot_start, slot_end, created_at = row[:8]
+        return {
+            'id': booking_id,
+            'user_id': user_id,
+            'slot_id': slot_id,
+            'user_name': user_name,
+            'user_email': user_email,
+            'slot_start': slot_start.isoformat() if slot_start else None,
+            'slot_end': slot_end.isoformat() if slot_end else None,
+            'created_at': created_at.isoformat() if created_at else None
+        }
+
+class IdempotencyKey(db.Model):
+    """Stored response of a POST sent with an Idempotency-Key header"""
+    __tablename__ = 'idempotency_keys'
+    
+    # sha256 of the endpoint scope and the client's key, so lookups are one
+    # fixed-width primary key probe whatever the client sends
+    key = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    # NULL while the first request is still running
+    status_code = db.Column(db.SmallInteger)
+    body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class ArchivedBooking(db.Model):
+    """A past booking moved out of `bookings` by the archive job (utils/archive.py).
+
+    The slot's times are copied onto the row because its Slot is deleted
+    with it. SQLite hands out the id of a deleted newest row again, so a
+    later booking can reuse an archived booking's id: the archive has its
+    own key and keeps the original id in booking_id.
+    """
+    __tablename__ = 'bookings_archive'
+    __table_args__ = (
+        db.Index('ix_bookings_archive_created_at_id', 'created_at', 'id'),
+        db.Index('ix_bookings_archive_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_bookings_archive_slot_start', 'slot_start'),
+        db.Index('ix_bookings_archive_booking_id', 'booking_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    slot_id = db.Column(db.Integer, nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    slot_end = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    @staticmethod
+    def listing_query():
+        """Select with the columns of Booking.listing_query, for Booking.row_to_dict,
+        followed by the archive key (`archive_id`) for keyset pagination"""
+        return db.select(
+            ArchivedBooking.booking_id,
+            ArchivedBooking.user_id,
+            ArchivedBooking.slot_id,
+            User.name,
+            User.email,
+            ArchivedBooking.slot_start,
+            ArchivedBooking.slot_end,
+            ArchivedBooking.created_at,
+            ArchivedBooking.id.label('archive_id')
+        ).outerjoin(User, User.id == ArchivedBooking.user_id)
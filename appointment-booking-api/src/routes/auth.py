@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, request
 from models.user import User, db
+from utils.passwords import HashingBusy
+from utils.ratelimit import admission
+from utils.idempotency import idempotent
 import jwt
 from datetime import datetime, timedelta
 import os
@@ -8,6 +11,17 @@ auth_bp = Blueprint('auth', __name__)
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
+def _hashing_busy(e):
+    """503 for a password hash that was refused or timed out"""
+    response = jsonify({
+        'error': {
+            'code': 'SERVER_BUSY',
+            'message': 'Too many requests in progress, please retry'
+        }
+    })
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
 def generate_token(user_id, role):
     payload = {
         'user_id': user_id,
@@ -16,7 +30,13 @@ def generate_token(user_id, role):
     }
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
+def _user_by_email(email):
+    """Select the user with an email (unique index on users.email)"""
+    return db.select(User).where(User.email == email)
+
 @auth_bp.route('/register', methods=['POST'])
+@admission('register')
+@idempotent('register')
 def register():
     try:
         data = request.json
@@ -31,7 +51,7 @@ def register():
             }), 400
         
         # Check if user already exists
-        existing_user = User.query.filter_by(email=data['email']).first()
+        existing_user = db.session.execute(_user_by_email(data['email'])).scalar()
         if existing_user:
             return jsonify({
                 'error': {
@@ -56,6 +76,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusy as e:
+        db.session.rollback()
+        return _hashing_busy(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -66,6 +89,7 @@ def register():
         }), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@admission('login')
 def login():
     try:
         data = request.json
@@ -80,7 +104,7 @@ def login():
             }), 400
         
         # Find user
-        user = User.query.filter_by(email=data['email']).first()
+        user = db.session.execute(_user_by_email(data['email'])).scalar()
         
         # Check credentials
         if not user or not user.check_password(data['password']):
@@ -91,6 +115,15 @@ def login():
                 }
             }), 401
         
+        # Upgrade hashes made with older parameters while we have the password
+        if user.password_needs_rehash():
+            try:
+                user.set_password(data['password'])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Password rehash failed for user {user.id}: {e}")
+        
         # Generate token
         token = generate_token(user.id, user.role)
         
@@ -100,6 +133,9 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except HashingBusy as e:
+        db.session.rollback()
+        return _hashing_busy(e)
     except Exception as e:
         return jsonify({
             'error': {
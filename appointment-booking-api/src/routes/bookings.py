@@ -1,12 +1,43 @@
-from flask import Blueprint, jsonify, request
-from models.user import User, Slot, Booking, db
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from models.user import User, Slot, Booking, ArchivedBooking, db
 from utils.auth import token_required
+from utils.slots import VIRTUAL_SLOTS, get_or_create_virtual_slot, get_or_create_virtual_slots, slot_event
+from utils.bookings import book_slot_atomic
+from utils.availability import availability_changed
+from utils.slot_index import availability_index, SLOT_INDEX_REJECT_BOOKED
+from utils.database import read_bind
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.ratelimit import admission
+from utils.idempotency import idempotent
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+import csv
+import io
+import json
+
+# Rows fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ['id', 'user_id', 'slot_id', 'user_name', 'user_email', 'slot_start', 'slot_end', 'created_at']
 
 bookings_bp = Blueprint('bookings', __name__)
 
+def _parse_id(value):
+    """A row id from a JSON body: an integer or numeric string, never a bool.
+
+    Returns None for anything else, which callers report as not found.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
 @bookings_bp.route('/book', methods=['POST'])
+@admission('book')
 @token_required
+@idempotent('book', per_user=True)
 def book_slot(current_user):
     try:
         data = request.json
@@ -20,21 +51,34 @@ def book_slot(current_user):
                 }
             }), 400
         
-        slot_id = data['slotId']
-        
-        # Check if slot exists
-        slot = Slot.query.get(slot_id)
-        if not slot:
+        # Slots the availability index has as booked are refused without a query
+        if SLOT_INDEX_REJECT_BOOKED and availability_index.is_booked(data['slotId']):
             return jsonify({
                 'error': {
-                    'code': 'SLOT_NOT_FOUND',
-                    'message': 'Slot not found'
+                    'code': 'SLOT_TAKEN',
+                    'message': 'This slot is already booked'
                 }
-            }), 404
+            }), 409
         
-        # Check if slot is already booked
-        existing_booking = Booking.query.filter_by(slot_id=slot_id).first()
-        if existing_booking:
+        # Virtual slots get their row on first booking
+        if VIRTUAL_SLOTS:
+            slot = get_or_create_virtual_slot(_parse_id(data['slotId']))
+            slot_id = slot.id if slot else None
+        else:
+            slot_id = _parse_id(data['slotId'])
+        
+        # Single INSERT ... SELECT that only succeeds for an existing, free slot
+        booking_id = book_slot_atomic(current_user.id, slot_id) if slot_id is not None else None
+        if booking_id is None:
+            db.session.rollback()
+            # Only the failure path pays for telling "missing" from "taken"
+            if slot_id is None or db.session.get(Slot, slot_id) is None:
+                return jsonify({
+                    'error': {
+                        'code': 'SLOT_NOT_FOUND',
+                        'message': 'Slot not found'
+                    }
+                }), 404
             return jsonify({
                 'error': {
                     'code': 'SLOT_TAKEN',
@@ -42,18 +86,16 @@ def book_slot(current_user):
                 }
             }), 409
         
-        # Create new booking
-        booking = Booking(
-            user_id=current_user.id,
-            slot_id=slot_id
-        )
-        
-        db.session.add(booking)
         db.session.commit()
         
+        booking = db.session.execute(
+            Booking.listing_query().where(Booking.id == booking_id)
+        ).one()
+        availability_changed(booked=[slot_event(booking.slot_id, booking.start_at)])
+        
         return jsonify({
             'message': 'Slot booked successfully',
-            'booking': booking.to_dict()
+            'booking': Booking.row_to_dict(booking)
         }), 201
         
     except IntegrityError:
@@ -86,9 +128,10 @@ def get_my_bookings(current_user):
                 }
             }), 403
         
-        bookings = Booking.query.filter_by(user_id=current_user.id).order_by(Booking.created_at.desc()).all()
+        # ?archived=1 lists the patient's bookings moved out by the archive job
+        rows = db.session.execute(_my_bookings_query(current_user.id, _archived()))
         
-        return jsonify([booking.to_dict() for booking in bookings]), 200
+        return jsonify([Booking.row_to_dict(row) for row in rows]), 200
         
     except Exception as e:
         return jsonify({
@@ -98,6 +141,75 @@ def get_my_bookings(current_user):
             }
         }), 500
 
+def _my_bookings_query(user_id, archived=False):
+    model = ArchivedBooking if archived else Booking
+    return model.listing_query().where(model.user_id == user_id).order_by(model.created_at.desc())
+
+def _parse_date_arg(name):
+    """Parse an optional YYYY-MM-DD query parameter; raises ValueError"""
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+def _archived():
+    """True for ?archived=1: read bookings_archive instead of bookings"""
+    return request.args.get('archived', '0') == '1'
+
+def _booking_filters(archived=False):
+    """Build filter clauses for the admin booking listing from query parameters"""
+    model = ArchivedBooking if archived else Booking
+    slot_start = ArchivedBooking.slot_start if archived else Slot.start_at
+    filters = []
+    
+    created_from = _parse_date_arg('from')
+    created_to = _parse_date_arg('to')
+    if created_from:
+        filters.append(model.created_at >= created_from)
+    if created_to:
+        filters.append(model.created_at < created_to + timedelta(days=1))
+    
+    slot_from = _parse_date_arg('slot_from')
+    slot_to = _parse_date_arg('slot_to')
+    if slot_from:
+        filters.append(slot_start >= slot_from)
+    if slot_to:
+        filters.append(slot_start < slot_to + timedelta(days=1))
+    
+    user_id = request.args.get('user_id')
+    if user_id:
+        filters.append(model.user_id == int(user_id))
+    
+    return filters
+
+def _listing_query(archived, filters, position=None, limit=None):
+    """Admin listing statement: without a limit every match newest first,
+    otherwise one keyset page (plus a row to tell whether more follow)"""
+    model = ArchivedBooking if archived else Booking
+    query = model.listing_query().where(*filters)
+    if limit is None:
+        return query.order_by(model.created_at.desc())
+    
+    # Keyset pagination: continue strictly after the last (created_at, id) seen
+    if position:
+        created_at, row_id = position
+        query = query.where(db.or_(
+            model.created_at < created_at,
+            db.and_(model.created_at == created_at, model.id < row_id)
+        ))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+def _count_query(archived, filters):
+    """Matching bookings, distinct patients and distinct appointment days"""
+    model = ArchivedBooking if archived else Booking
+    slot_start = ArchivedBooking.slot_start if archived else Slot.start_at
+    query = db.select(
+        db.func.count(model.id),
+        db.func.count(db.distinct(model.user_id)),
+        db.func.count(db.distinct(db.func.date(slot_start)))
+    ).select_from(model)
+    if not archived:
+        query = query.outerjoin(Slot, Slot.id == Booking.slot_id)
+    return query.where(*filters)
+
 @bookings_bp.route('/all-bookings', methods=['GET'])
 @token_required
 def get_all_bookings(current_user):
@@ -111,9 +223,61 @@ def get_all_bookings(current_user):
                 }
             }), 403
         
-        bookings = Booking.query.order_by(Booking.created_at.desc()).all()
+        # Bookings moved out by the archive job are only read with ?archived=1
+        archived = _archived()
+        try:
+            filters = _booking_filters(archived)
+        except ValueError:
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_FILTER',
+                    'message': 'Dates should be YYYY-MM-DD and user_id an integer'
+                }
+            }), 400
+        
+        # Without pagination parameters keep returning the full array
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            rows = db.session.execute(_listing_query(archived, filters), bind_arguments=read_bind())
+            return jsonify([Booking.row_to_dict(row) for row in rows]), 200
         
-        return jsonify([booking.to_dict() for booking in bookings]), 200
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            position = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_PAGINATION',
+                    'message': 'limit must be a positive integer and cursor a value returned by this endpoint'
+                }
+            }), 400
+        
+        # The dashboard's stats describe every match, not just the loaded pages
+        total = patients = days = None
+        if request.args.get('include_total', '1') != '0':
+            total, patients, days = db.session.execute(
+                _count_query(archived, filters),
+                bind_arguments=read_bind()
+            ).one()
+        
+        rows = db.session.execute(
+            _listing_query(archived, filters, position, limit),
+            bind_arguments=read_bind()
+        ).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last.created_at, last.archive_id if archived else last.id)
+        
+        return jsonify({
+            'bookings': [Booking.row_to_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+            'total': total,
+            'patients': patients,
+            'days': days
+        }), 200
         
     except Exception as e:
         return jsonify({
@@ -124,12 +288,92 @@ def get_all_bookings(current_user):
         }), 500
 
 
+def _export_ndjson(rows):
+    for row in rows:
+        yield json.dumps(Booking.row_to_dict(row)) + '\n'
+
+def _export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    
+    for index, row in enumerate(rows):
+        # Flush in batches rather than one tiny chunk per row
+        if index % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow(Booking.row_to_dict(row))
+    
+    yield buffer.getvalue()
+
+@bookings_bp.route('/bookings/export', methods=['GET'])
+@token_required
+def export_bookings(current_user):
+    """Stream bookings as NDJSON or CSV without loading them into memory"""
+    if current_user.role != 'admin':
+        return jsonify({
+            'error': {
+                'code': 'FORBIDDEN',
+                'message': 'Only admins can export bookings'
+            }
+        }), 403
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({
+            'error': {
+                'code': 'INVALID_FORMAT',
+                'message': 'Format should be ndjson or csv'
+            }
+        }), 400
+    
+    archived = _archived()
+    model = ArchivedBooking if archived else Booking
+    try:
+        filters = _booking_filters(archived)
+    except ValueError:
+        return jsonify({
+            'error': {
+                'code': 'INVALID_FILTER',
+                'message': 'Dates should be YYYY-MM-DD and user_id an integer'
+            }
+        }), 400
+    
+    # yield_per streams rows in batches (server-side cursor on PostgreSQL)
+    query = model.listing_query().where(*filters).order_by(
+        model.created_at.desc(), model.id.desc()
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    def generate():
+        rows = db.session.execute(query, bind_arguments=read_bind())
+        try:
+            if export_format == 'csv':
+                yield from _export_csv(rows)
+            else:
+                yield from _export_ndjson(rows)
+        finally:
+            rows.close()
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    prefix = 'bookings-archive' if archived else 'bookings'
+    filename = f"{prefix}-{datetime.utcnow():%Y%m%d}.{export_format}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+def _booking_with_slot(booking_id):
+    return db.select(Booking).options(joinedload(Booking.slot)).where(Booking.id == booking_id)
+
 @bookings_bp.route('/cancel/<int:booking_id>', methods=['DELETE'])
 @token_required
 def cancel_booking(current_user, booking_id):
     try:
-        # Find the booking
-        booking = Booking.query.get(booking_id)
+        # Find the booking, with its slot in the same query
+        booking = db.session.execute(_booking_with_slot(booking_id)).scalar()
         if not booking:
             return jsonify({
                 'error': {
@@ -159,8 +403,10 @@ def cancel_booking(current_user, booking_id):
             }), 400
         
         # Delete the booking (this will free up the slot)
+        freed = slot_event(booking.slot_id, booking.slot.start_at)
         db.session.delete(booking)
         db.session.commit()
+        availability_changed(freed=[freed])
         
         return jsonify({
             'message': 'Booking cancelled successfully',
@@ -176,3 +422,214 @@ def cancel_booking(current_user, booking_id):
             }
         }), 500
 
+
+# Upper bound on items in one batch request
+MAX_BATCH_SIZE = 100
+BATCH_MODES = ('all_or_nothing', 'best_effort')
+
+def _parse_batch(data, key):
+    """Validate a batch request body; returns (ids, mode) or an error response"""
+    ids = data.get(key) if data else None
+    mode = (data or {}).get('mode', 'all_or_nothing')
+    if not isinstance(ids, list) or not ids:
+        return None, None, (jsonify({
+            'error': {
+                'code': 'MISSING_IDS',
+                'message': f'{key} must be a non-empty list'
+            }
+        }), 400)
+    if len(ids) > MAX_BATCH_SIZE:
+        return None, None, (jsonify({
+            'error': {
+                'code': 'BATCH_TOO_LARGE',
+                'message': f'At most {MAX_BATCH_SIZE} items per batch'
+            }
+        }), 400)
+    if mode not in BATCH_MODES:
+        return None, None, (jsonify({
+            'error': {
+                'code': 'INVALID_MODE',
+                'message': 'Mode should be all_or_nothing or best_effort'
+            }
+        }), 400)
+    return ids, mode, None
+
+def _batch_status(results, mode, success_status):
+    """HTTP status for a batch: success_status unless an all-or-nothing batch failed"""
+    failed = any(result['status'] == 'error' for result in results)
+    if failed and mode == 'all_or_nothing':
+        return 409
+    return success_status if not failed else 200
+
+def _item_error(code, message):
+    return {'status': 'error', 'error': {'code': code, 'message': message}}
+
+@bookings_bp.route('/book/batch', methods=['POST'])
+@admission('book')
+@token_required
+def book_slots_batch(current_user):
+    """Book several slots in one transaction with a result per slot"""
+    try:
+        data = request.json
+        slot_ids, mode, error = _parse_batch(data, 'slotIds')
+        if error:
+            return error
+        
+        # Front desk (admins) may book on behalf of a patient
+        user_id = _parse_id(data.get('userId', current_user.id))
+        if user_id is None:
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_USER_ID',
+                    'message': 'userId must be an integer'
+                }
+            }), 400
+        if user_id != current_user.id:
+            if current_user.role != 'admin':
+                return jsonify({
+                    'error': {
+                        'code': 'FORBIDDEN',
+                        'message': 'Only admins can book for other users'
+                    }
+                }), 403
+            if db.session.get(User, user_id) is None:
+                return jsonify({
+                    'error': {
+                        'code': 'USER_NOT_FOUND',
+                        'message': 'User not found'
+                    }
+                }), 404
+        
+        # Ids are parsed as /book does; virtual slots are then resolved in
+        # bulk rather than one lookup per item
+        row_ids = [_parse_id(requested_id) for requested_id in slot_ids]
+        if VIRTUAL_SLOTS:
+            row_ids = get_or_create_virtual_slots(row_ids)
+        
+        results = []
+        for requested_id, slot_id in zip(slot_ids, row_ids):
+            result = {'slotId': requested_id}
+            
+            # The atomic insert never raises on a taken slot, so one failed
+            # item leaves the rest of the transaction usable
+            booking_id = book_slot_atomic(user_id, slot_id) if slot_id is not None else None
+            if booking_id is not None:
+                result.update(status='booked', bookingId=booking_id)
+            elif slot_id is None or db.session.get(Slot, slot_id) is None:
+                result.update(_item_error('SLOT_NOT_FOUND', 'Slot not found'))
+            else:
+                result.update(_item_error('SLOT_TAKEN', 'This slot is already booked'))
+            results.append(result)
+        
+        status = _batch_status(results, mode, 201)
+        if status == 409:
+            db.session.rollback()
+            for result in results:
+                if result['status'] == 'booked':
+                    result['status'] = 'rolled_back'
+                    del result['bookingId']
+            return jsonify({'message': 'No slots were booked', 'results': results}), status
+        
+        db.session.commit()
+        
+        booked_ids = [result['bookingId'] for result in results if result['status'] == 'booked']
+        rows = db.session.execute(Booking.listing_query().where(Booking.id.in_(booked_ids))).all() if booked_ids else []
+        bookings = {row.id: Booking.row_to_dict(row) for row in rows}
+        if rows:
+            availability_changed(booked=[slot_event(row.slot_id, row.start_at) for row in rows])
+        for result in results:
+            if result['status'] == 'booked':
+                result['booking'] = bookings.get(result['bookingId'])
+        
+        return jsonify({
+            'message': f'{len(booked_ids)} of {len(results)} slots booked',
+            'results': results
+        }), status
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': {
+                'code': 'BOOKING_FAILED',
+                'message': str(e)
+            }
+        }), 500
+
+@bookings_bp.route('/cancel/batch', methods=['POST'])
+@token_required
+def cancel_bookings_batch(current_user):
+    """Cancel several bookings in one transaction with a result per booking"""
+    try:
+        data = request.json
+        booking_ids, mode, error = _parse_batch(data, 'bookingIds')
+        if error:
+            return error
+        
+        # Each booking is handled once, so a repeated id is neither reported
+        # twice nor freed twice
+        requested, seen = [], set()
+        for value in booking_ids:
+            booking_id = _parse_id(value)
+            if booking_id is not None:
+                if booking_id in seen:
+                    continue
+                seen.add(booking_id)
+            requested.append((value, booking_id))
+        
+        # One query for ownership and start times of every requested booking
+        valid_ids = list(seen)
+        found = {
+            row.id: row for row in db.session.execute(
+                db.select(Booking.id, Booking.user_id, Booking.slot_id, Slot.start_at)
+                .join(Slot, Slot.id == Booking.slot_id)
+                .where(Booking.id.in_(valid_ids))
+            )
+        } if valid_ids else {}
+        
+        now = datetime.now()
+        results = []
+        for value, booking_id in requested:
+            result = {'bookingId': value}
+            row = found.get(booking_id)
+            if row is None:
+                result.update(_item_error('BOOKING_NOT_FOUND', 'Booking not found'))
+            elif current_user.role != 'admin' and row.user_id != current_user.id:
+                result.update(_item_error('FORBIDDEN', 'You can only cancel your own bookings'))
+            elif row.start_at < now:
+                result.update(_item_error('PAST_BOOKING', 'Cannot cancel past appointments'))
+            else:
+                result['status'] = 'cancelled'
+            results.append(result)
+        
+        status = _batch_status(results, mode, 200)
+        if status == 409:
+            for result in results:
+                if result['status'] == 'cancelled':
+                    result['status'] = 'rolled_back'
+            return jsonify({'message': 'No bookings were cancelled', 'results': results}), status
+        
+        cancelled_ids = [
+            booking_id for (value, booking_id), result in zip(requested, results)
+            if result['status'] == 'cancelled'
+        ]
+        if cancelled_ids:
+            db.session.execute(db.delete(Booking).where(Booking.id.in_(cancelled_ids)))
+            db.session.commit()
+            availability_changed(freed=[
+                slot_event(found[booking_id].slot_id, found[booking_id].start_at)
+                for booking_id in cancelled_ids
+            ])
+        
+        return jsonify({
+            'message': f'{len(cancelled_ids)} of {len(results)} bookings cancelled',
+            'results': results
+        }), status
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': {
+                'code': 'BOOKING_CANCEL_FAILED',
+                'message': str(e)
+            }
+        }), 500
@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, jsonify, request
+from utils.auth import user_cache
+from utils.events import event_hub
+from utils.slot_index import availability_index
+from utils.metrics import registry, METRICS_TOKEN
+import hmac
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def _cache_and_stream_stats():
+    """Scrape-time gauges for the user cache, slot index and open event streams"""
+    stats = user_cache.stats()
+    index_stats = availability_index.stats()
+    return [
+        ('user_cache_hits_total', 'counter', 'Authenticated user cache hits', stats['hits']),
+        ('user_cache_misses_total', 'counter', 'Authenticated user cache misses', stats['misses']),
+        ('user_cache_entries', 'gauge', 'Users currently cached', stats['size']),
+        ('slot_index_hits_total', 'counter', 'Slot queries answered from the availability index', index_stats['hits']),
+        ('slot_index_misses_total', 'counter', 'Slot queries the availability index left to the database', index_stats['misses']),
+        ('slot_index_age_seconds', 'gauge', 'Seconds since the availability index was rebuilt', index_stats['age']),
+        ('slot_stream_subscribers', 'gauge', 'Open /api/slots/stream connections', event_hub.subscriber_count()),
+    ]
+
+registry.add_collector(_cache_and_stream_stats)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose this worker's metrics in the Prometheus text format"""
+    # Route names, latencies and query counts are not for the public
+    if not METRICS_TOKEN:
+        return jsonify({'error': {'code': 'METRICS_DISABLED', 'message': 'Metrics are disabled'}}), 404
+
+    auth_header = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(auth_header, f'Bearer {METRICS_TOKEN}'):
+        return jsonify({'error': {'code': 'UNAUTHORIZED', 'message': 'Metrics token required'}}), 401
+
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -1,30 +1,125 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request
 from models.user import Slot, Booking, db
 from datetime import datetime, timedelta
+from utils.scheduler import ensure_materialized, SLOT_HORIZON_DAYS
+from utils.slots import (
+    VIRTUAL_SLOTS, virtual_free_slots, virtual_free_slot_starts, virtual_slot_id,
+    compact_listing, compact_from_rows
+)
+from utils.availability import availability_version, slots_cache
+from utils.slot_index import availability_index
+from utils.events import event_hub, sse_message, SSE_HEARTBEAT, SSE_MAX_AGE, SSE_RETRY_MS
+from utils.database import read_bind
+import gzip
+import os
+import queue
+import time
+
+# Under WSGI every open stream holds a worker thread until it closes. asgi.py
+# serves streams on its event loop instead; plain WSGI servers only stream
+# when this is set (e.g. gevent workers), otherwise they answer 204, which
+# tells EventSource not to reconnect
+SSE_WSGI_STREAMS = os.environ.get('SSE_WSGI_STREAMS', '0') == '1'
+
+# Compact listings at least this large are gzipped for clients that accept it
+SLOTS_GZIP_MIN_BYTES = int(os.environ.get('SLOTS_GZIP_MIN_BYTES', 1024))
+
+# Media type of the column-wise listing (also selected with ?format=compact)
+COMPACT_MIMETYPE = 'application/vnd.appointments.slots-compact+json'
 
 slots_bp = Blueprint('slots', __name__)
 
-def generate_slots_for_date_range(start_date, end_date):
-    """Generate 30-minute slots between 9:00-17:00 for the given date range"""
-    slots = []
-    current_date = start_date
+def _free_slots_query(from_date, to_date, *columns):
+    """Unbooked materialized slots in a date range, ordered by start time"""
+    return db.select(*columns).select_from(Slot).outerjoin(Booking).where(
+        Slot.start_at >= from_date,
+        Slot.start_at <= to_date + timedelta(days=1),
+        Booking.id.is_(None)  # Only slots without bookings
+    ).order_by(Slot.start_at)
+
+def _first_free_query(after, *columns):
+    """Earliest unbooked materialized slot starting at or after `after`"""
+    return db.select(*columns).select_from(Slot).outerjoin(Booking).where(
+        Slot.start_at >= after,
+        Booking.id.is_(None)
+    ).order_by(Slot.start_at).limit(1)
+
+# Built from plain rows, in the shape of Slot.to_dict: going through Slot
+# objects would lazy-load each slot's (known to be missing) booking
+FREE_SLOT_COLUMNS = (Slot.id, Slot.start_at, Slot.end_at, Slot.created_at)
+
+def _free_slot_dict(row):
+    slot_id, start_at, end_at, created_at = row
+    return {
+        'id': slot_id,
+        'start_at': start_at.isoformat(),
+        'end_at': end_at.isoformat(),
+        'is_booked': False,
+        'created_at': created_at.isoformat() if created_at else None
+    }
+
+def free_slots(from_date, to_date):
+    """List the unbooked slots in a date range as dictionaries"""
+    # Upcoming days come from the in-memory availability index when it covers them
+    slots = availability_index.free_slots(from_date, to_date)
+    if slots is not None:
+        return slots
     
-    while current_date <= end_date:
-        # Generate slots from 9:00 to 17:00 (30-minute intervals)
-        for hour in range(9, 17):
-            for minute in [0, 30]:
-                slot_start = current_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                slot_end = slot_start + timedelta(minutes=30)
-                
-                # Check if slot already exists
-                existing_slot = Slot.query.filter_by(start_at=slot_start).first()
-                if not existing_slot:
-                    slot = Slot(start_at=slot_start, end_at=slot_end)
-                    slots.append(slot)
-        
-        current_date += timedelta(days=1)
+    # Virtual mode: free slots are computed from the schedule
+    if VIRTUAL_SLOTS:
+        return virtual_free_slots(from_date, to_date)
     
-    return slots
+    # Slots are kept materialized ahead by the scheduler; only generate
+    # on demand when the range goes past the materialized horizon
+    ensure_materialized(to_date)
+    
+    # Read from the primary: the listing is cached and ETagged under the
+    # primary's availability version, which a lagging replica may not match
+    rows = db.session.execute(_free_slots_query(from_date, to_date, *FREE_SLOT_COLUMNS))
+    return [_free_slot_dict(row) for row in rows]
+
+def free_slot_columns(from_date, to_date):
+    """free_slots() in the compact column-wise format (see compact_listing)"""
+    days = availability_index.free_days(from_date, to_date)
+    if days is not None:
+        return compact_listing(days)
+    
+    if VIRTUAL_SLOTS:
+        return compact_from_rows(
+            (virtual_slot_id(slot_start), slot_start)
+            for slot_start in virtual_free_slot_starts(from_date, to_date)
+        )
+    
+    ensure_materialized(to_date)
+    # Primary only, as in free_slots()
+    return compact_from_rows(db.session.execute(_free_slots_query(from_date, to_date, Slot.id, Slot.start_at)))
+
+def _listing_format():
+    """'json' (default) or 'compact', from ?format= or the Accept header"""
+    listing_format = request.args.get('format')
+    if listing_format is None:
+        best = request.accept_mimetypes.best_match(['application/json', COMPACT_MIMETYPE])
+        listing_format = 'compact' if best == COMPACT_MIMETYPE else 'json'
+    return listing_format
+
+def first_free_slot(after):
+    """Earliest unbooked slot starting at or after `after`, as a dictionary"""
+    slot = availability_index.first_available(after)
+    if slot is not None:
+        return slot
+    
+    if VIRTUAL_SLOTS:
+        from_date = after.replace(hour=0, minute=0, second=0, microsecond=0)
+        return next((
+            slot for slot in virtual_free_slots(from_date, from_date + timedelta(days=SLOT_HORIZON_DAYS))
+            if datetime.fromisoformat(slot['start_at']) >= after
+        ), None)
+    
+    row = db.session.execute(
+        _first_free_query(after, *FREE_SLOT_COLUMNS),
+        bind_arguments=read_bind()
+    ).first()
+    return _free_slot_dict(row) if row else None
 
 @slots_bp.route('/slots', methods=['GET'])
 def get_slots():
@@ -49,22 +144,61 @@ def get_slots():
                     }
                 }), 400
         
-        # Generate slots if they don't exist
-        new_slots = generate_slots_for_date_range(from_date, to_date)
-        if new_slots:
-            db.session.add_all(new_slots)
-            db.session.commit()
+        listing_format = _listing_format()
+        if listing_format not in ('json', 'compact'):
+            return jsonify({
+                'error': {
+                    'code': 'INVALID_FORMAT',
+                    'message': 'format should be json or compact'
+                }
+            }), 400
+        compact = listing_format == 'compact'
+        
+        # Listings only change when a booking is made or cancelled, which
+        # bumps the availability version; unchanged ranges cost no query
+        version, changed_at = availability_version.current()
+        etag = f"slots-{version}-{from_date:%Y%m%d}-{to_date:%Y%m%d}"
+        if compact:
+            etag += '-compact'
         
-        # Query available slots (not booked)
-        slots = db.session.query(Slot).outerjoin(Booking).filter(
-            Slot.start_at >= from_date,
-            Slot.start_at <= to_date + timedelta(days=1),
-            Booking.id.is_(None)  # Only slots without bookings
-        ).order_by(Slot.start_at).all()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif compact and request.if_none_match.contains(etag + '-gzip'):
+            etag += '-gzip'
+            response = Response(status=304)
+        else:
+            cache_key = (from_date, to_date, listing_format)
+            cached = slots_cache.get(cache_key, version)
+            if cached is None:
+                if compact:
+                    body = current_app.json.dumps(free_slot_columns(from_date, to_date))
+                    # Compressed once per version rather than per response
+                    gzipped = gzip.compress(body.encode(), compresslevel=6) if len(body) >= SLOTS_GZIP_MIN_BYTES else None
+                    cached = (body, gzipped)
+                else:
+                    cached = current_app.json.dumps(free_slots(from_date, to_date))
+                slots_cache.set(cache_key, version, cached)
+            
+            if compact:
+                body, gzipped = cached
+                response = Response(body, status=200, mimetype=COMPACT_MIMETYPE)
+                if gzipped is not None and request.accept_encodings['gzip'] > 0:
+                    response.set_data(gzipped)
+                    response.content_encoding = 'gzip'
+                    etag += '-gzip'
+            else:
+                response = Response(cached, status=200, mimetype='application/json')
         
-        return jsonify([slot.to_dict() for slot in slots]), 200
+        response.set_etag(etag)
+        response.last_modified = datetime.utcfromtimestamp(changed_at)
+        response.cache_control.no_cache = True
+        response.vary.add('Accept')
+        if compact:
+            response.vary.add('Accept-Encoding')
+        return response
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'error': {
                 'code': 'SLOTS_FETCH_FAILED',
@@ -72,3 +206,67 @@ def get_slots():
             }
         }), 500
 
+
+@slots_bp.route('/slots/first-available', methods=['GET'])
+def get_first_available_slot():
+    try:
+        slot = first_free_slot(datetime.now())
+        if slot is None:
+            return jsonify({
+                'error': {
+                    'code': 'NO_AVAILABLE_SLOTS',
+                    'message': 'No free slots are available'
+                }
+            }), 404
+        
+        return jsonify(slot), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': {
+                'code': 'SLOTS_FETCH_FAILED',
+                'message': str(e)
+            }
+        }), 500
+
+
+@slots_bp.route('/slots/stream', methods=['GET'])
+def stream_slots():
+    """Server-Sent Events feed of slots being booked and freed.
+
+    Events are `booked` and `freed` with the affected slots, or `resync` when
+    the client fell behind and should refetch /api/slots. Streams close after
+    SSE_MAX_AGE seconds and EventSource reconnects.
+    """
+    if not SSE_WSGI_STREAMS:
+        return Response(status=204)
+    
+    subscription = event_hub.subscribe()
+    
+    def generate():
+        try:
+            yield f'retry: {SSE_RETRY_MS}\n\n'
+            closes_at = time.monotonic() + SSE_MAX_AGE
+            while True:
+                timeout = min(SSE_HEARTBEAT, closes_at - time.monotonic())
+                if timeout <= 0:
+                    break
+                try:
+                    event = subscription.get(timeout=timeout)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield sse_message(event)
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def live_updates_available():
+    """Whether this server holds /api/slots/stream open without a thread per stream"""
+    return current_app.config.get('ASYNC_EVENT_STREAMS', False) or SSE_WSGI_STREAMS
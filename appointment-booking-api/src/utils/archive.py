@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from models.user import db, Slot, Booking, ArchivedBooking
+from utils.scheduler import PeriodicJob
+
+# Bookings whose slot started more than this many days ago are moved to
+# bookings_archive, and past slots without a booking are deleted. 0 turns
+# the in-process job off (the CLI command still works with --days).
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+# Rows moved per transaction, so no batch holds the write lock for long
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+# Seconds the scheduled job sleeps between batches to let requests write
+ARCHIVE_BATCH_PAUSE = float(os.environ.get('ARCHIVE_BATCH_PAUSE', 0.1))
+ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 86400))
+ARCHIVE_LOCK = os.environ.get(
+    'ARCHIVE_LOCK',
+    os.path.join(tempfile.gettempdir(), 'appointment-archive.lock')
+)
+ARCHIVE_ENABLED = os.environ.get('ARCHIVE_ENABLED', '1') == '1' and ARCHIVE_AFTER_DAYS > 0
+
+
+def archive_cutoff(days=ARCHIVE_AFTER_DAYS):
+    """Start of the oldest day that stays in the hot tables"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+def _archivable_bookings_query(cutoff, batch_size):
+    return (
+        db.select(Booking.id, Booking.user_id, Booking.slot_id, Slot.start_at, Slot.end_at, Booking.created_at)
+        .join(Slot, Slot.id == Booking.slot_id)
+        .where(Slot.start_at < cutoff)
+        .order_by(Slot.start_at)
+        .limit(batch_size)
+    )
+
+
+def _past_free_slots_query(cutoff, batch_size):
+    return (
+        db.select(Slot.id)
+        .where(Slot.start_at < cutoff, ~db.select(Booking.id).where(Booking.slot_id == Slot.id).exists())
+        .order_by(Slot.start_at)
+        .limit(batch_size)
+    )
+
+
+def archive_booking_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move up to batch_size bookings of slots starting before cutoff, with
+    their slots, into bookings_archive and commit. Returns the number moved."""
+    rows = db.session.execute(_archivable_bookings_query(cutoff, batch_size)).all()
+    if not rows:
+        db.session.rollback()
+        return 0
+
+    archived_at = datetime.utcnow()
+    db.session.execute(db.insert(ArchivedBooking), [
+        {'booking_id': row.id, 'user_id': row.user_id, 'slot_id': row.slot_id, 'slot_start': row.start_at,
+         'slot_end': row.end_at, 'created_at': row.created_at, 'archived_at': archived_at}
+        for row in rows
+    ])
+    db.session.execute(db.delete(Booking).where(Booking.id.in_([row.id for row in rows])))
+    db.session.execute(db.delete(Slot).where(Slot.id.in_([row.slot_id for row in rows])))
+    db.session.commit()
+    return len(rows)
+
+
+def delete_free_slot_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Delete up to batch_size unbooked slots starting before cutoff and commit.
+    Returns the number deleted."""
+    slot_ids = db.session.execute(_past_free_slots_query(cutoff, batch_size)).scalars().all()
+    if not slot_ids:
+        db.session.rollback()
+        return 0
+    db.session.execute(db.delete(Slot).where(Slot.id.in_(slot_ids)))
+    db.session.commit()
+    return len(slot_ids)
+
+
+def archive_past(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, pause=0):
+    """Archive everything older than `days` days in batches of batch_size.
+
+    Each batch is its own transaction, so an interrupted run leaves the
+    tables consistent and the next run continues where it stopped.
+    Returns (bookings archived, free slots deleted).
+    """
+    cutoff = archive_cutoff(days)
+    totals = []
+    for step in (archive_booking_batch, delete_free_slot_batch):
+        total = 0
+        while True:
+            moved = step(cutoff, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        totals.append(total)
+    return tuple(totals)
+
+
+class ArchiveScheduler(PeriodicJob):
+    """Periodic job moving bookings older than ARCHIVE_AFTER_DAYS out of the hot tables"""
+
+    name = 'archive-scheduler'
+    label = 'Archive job'
+
+    def __init__(self, app, days=ARCHIVE_AFTER_DAYS, interval=ARCHIVE_INTERVAL, lock_path=ARCHIVE_LOCK):
+        super().__init__(app, interval, lock_path)
+        self.days = days
+
+    def job(self):
+        archived, deleted = archive_past(self.days, pause=ARCHIVE_BATCH_PAUSE)
+        if archived or deleted:
+            print(f"Archive job moved {archived} bookings and deleted {deleted} free slots")
+        return archived, deleted
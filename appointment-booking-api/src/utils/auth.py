@@ -1,11 +1,109 @@
+from collections import OrderedDict
 from functools import wraps
 from flask import request, jsonify
+from sqlalchemy import event
 import jwt
 import os
-from models.user import User
+import threading
+import time
+from models.user import User, db
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
+# Per-process cache of authenticated users (seconds / entries)
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
+# Build the current user from the JWT claims alone, without any DB lookup.
+# A deleted user or changed role is then only noticed when the token expires.
+AUTH_TRUST_TOKEN_CLAIMS = os.environ.get('AUTH_TRUST_TOKEN_CLAIMS', '0') == '1'
+
+class AuthenticatedUser:
+    """Detached snapshot of a User, safe to share between requests"""
+    
+    __slots__ = ('id', 'name', 'email', 'role', 'created_at')
+    
+    def __init__(self, id, role, name=None, email=None, created_at=None):
+        self.id = id
+        self.role = role
+        self.name = name
+        self.email = email
+        self.created_at = created_at
+    
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.role, user.name, user.email, user.created_at)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'role': self.role,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class UserCache:
+    """Thread-safe TTL + LRU cache of AuthenticatedUser keyed by user id"""
+    
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user_id):
+        """Return the cached user, loading it from the database on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        
+        snapshot = AuthenticatedUser.from_user(user)
+        if self.ttl > 0 and self.max_size > 0:
+            with self._lock:
+                self._entries[user_id] = (snapshot, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return snapshot
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+user_cache = UserCache()
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    """Drop a user from the cache as soon as it is changed or deleted"""
+    user_cache.invalidate(target.id)
+
+def load_current_user(claims):
+    """Resolve the authenticated user for decoded token claims"""
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        return AuthenticatedUser(claims['user_id'], claims['role'])
+    return user_cache.get(claims['user_id'])
+
 def token_required(f):
     """Decorator to require authentication token"""
     @wraps(f)
@@ -36,7 +134,7 @@ def token_required(f):
         try:
             # Decode the token
             data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            current_user = load_current_user(data)
             
             if not current_user:
                 return jsonify({
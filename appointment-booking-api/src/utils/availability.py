@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from utils.events import event_hub
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# File holding a version shared by every worker on the host; without it each
+# process keeps its own counter and ETags are only reused by the same worker
+AVAILABILITY_VERSION_FILE = os.environ.get('AVAILABILITY_VERSION_FILE')
+
+# Seconds a cached slot listing may be served without a version change. Keeps
+# per-process caches from lagging far behind bookings made by other workers.
+SLOTS_CACHE_TTL = float(os.environ.get('SLOTS_CACHE_TTL', 5))
+SLOTS_CACHE_SIZE = int(os.environ.get('SLOTS_CACHE_SIZE', 256))
+
+
+def _ttl_bucket():
+    """Version suffix that rolls over every SLOTS_CACHE_TTL seconds.
+
+    ETags (and cached bodies) are then at most that stale even when a change
+    was missed; with the TTL at 0 every call returns a new value and no 304s
+    are answered.
+    """
+    return int(time.time() // SLOTS_CACHE_TTL) if SLOTS_CACHE_TTL > 0 else time.monotonic_ns()
+
+
+class LocalVersion:
+    """Monotonic availability version private to this process.
+
+    Bookings made by other workers do not bump it; the TTL bucket bounds how
+    long this worker's listings can miss them.
+    """
+
+    def __init__(self):
+        # Distinguishes this process's counter from other workers' in ETags
+        self.scope = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._changed_at = time.time()
+        self._lock = threading.Lock()
+
+    def current(self):
+        return f"{self.scope}.{self._version}.{_ttl_bucket()}", self._changed_at
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._changed_at = time.time()
+
+
+class FileVersion:
+    """Monotonic availability version shared through a small file.
+
+    Carries the same TTL bucket as LocalVersion, so both backends expire
+    listings and ETags after SLOTS_CACHE_TTL seconds.
+    """
+
+    scope = 'shared'
+
+    def __init__(self, path):
+        self.path = path
+
+    def current(self):
+        try:
+            with open(self.path) as f:
+                version, changed_at = f.read().strip() or 0, os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            version, changed_at = 0, 0.0
+        return f"{self.scope}.{version}.{_ttl_bucket()}", changed_at
+
+    def bump(self):
+        with open(self.path, 'a+') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            version = int(f.read().strip() or 0) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(version))
+
+
+availability_version = FileVersion(AVAILABILITY_VERSION_FILE) if AVAILABILITY_VERSION_FILE else LocalVersion()
+
+
+def availability_changed(booked=(), freed=()):
+    """Call after committing anything that books or frees a slot.
+
+    `booked` and `freed` are slot dicts (id, start_at, end_at) pushed to
+    /api/slots/stream subscribers as incremental deltas.
+    """
+    availability_version.bump()
+    if booked:
+        event_hub.publish({'type': 'booked', 'slots': list(booked)})
+    if freed:
+        event_hub.publish({'type': 'freed', 'slots': list(freed)})
+
+
+class ResponseCache:
+    """Small LRU of serialized responses tagged with the version they were built at"""
+
+    def __init__(self, ttl=SLOTS_CACHE_TTL, max_size=SLOTS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_version, expires_at, body = entry
+            if entry_version != version or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, version, body):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slots_cache = ResponseCache()
@@ -0,0 +1,42 @@
+from datetime import datetime
+from sqlalchemy import insert
+from models.user import Slot, Booking, db
+
+
+def _insert_booking(source):
+    """INSERT ... SELECT into bookings that silently skips a taken slot_id"""
+    columns = ['user_id', 'slot_id', 'created_at']
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(Booking).from_select(columns, source).on_conflict_do_nothing(index_elements=['slot_id'])
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(Booking).from_select(columns, source).on_conflict_do_nothing(index_elements=['slot_id'])
+    # Other backends raise IntegrityError on a lost race instead
+    return insert(Booking).from_select(columns, source)
+
+
+def _free_slot_source(user_id, slot_id):
+    """SELECT of the new booking's row, empty unless the slot exists and is free"""
+    return db.select(
+        db.literal(user_id, db.Integer),
+        Slot.id,
+        db.literal(datetime.utcnow(), db.DateTime)
+    ).where(
+        Slot.id == slot_id,
+        ~db.select(Booking.id).where(Booking.slot_id == slot_id).exists()
+    )
+
+
+def book_slot_atomic(user_id, slot_id):
+    """Book a slot in a single statement.
+
+    The insert only selects a row when the slot exists and has no booking,
+    and ON CONFLICT DO NOTHING covers a concurrent insert of the same slot,
+    so no prior existence checks or row locks are needed. Returns the new
+    booking id, or None if the slot does not exist or is already booked.
+    The caller is responsible for committing.
+    """
+    source = _free_slot_source(user_id, slot_id)
+    return db.session.execute(_insert_booking(source).returning(Booking.id)).scalar()
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models.user import db
+
+# SQLite pragmas applied to every new connection. WAL lets readers proceed
+# while a writer commits, which matters once several workers share the file.
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+
+# Connection pool settings (recycle, timeout and pre-ping only apply to
+# server databases such as PostgreSQL)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+
+# Optional read replica used by the GET listing endpoints
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+
+
+def normalize_url(url):
+    """Accept the postgres:// scheme some hosts hand out"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """SQLAlchemy engine options for a database URL"""
+    if url.startswith('sqlite'):
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {'pool_size': DB_POOL_SIZE, 'max_overflow': DB_MAX_OVERFLOW}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the SQLITE_* pragmas to each new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    cursor.close()
+
+
+def configure_database(app, default_url):
+    """Set the database URI, engine options and replica bind on the app config"""
+    url = normalize_url(os.environ.get('DATABASE_URL') or default_url)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    if DATABASE_REPLICA_URL:
+        replica_url = normalize_url(DATABASE_REPLICA_URL)
+        app.config['SQLALCHEMY_BINDS'] = {
+            'replica': {'url': replica_url, **engine_options(replica_url)}
+        }
+
+
+def read_bind():
+    """Bind arguments routing a read-only statement to the replica, if configured.
+
+    Usage: db.session.execute(stmt, bind_arguments=read_bind())
+    Replicas lag the primary, so only use this for listings that tolerate it.
+    """
+    if DATABASE_REPLICA_URL:
+        return {'bind': db.engines['replica']}
+    return None
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+# 'local' fans out within this process only; 'sqlite' relays events between
+# workers on one host through a shared SQLite file
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+EVENTS_SQLITE_PATH = os.environ.get(
+    'EVENTS_SQLITE_PATH',
+    os.path.join(tempfile.gettempdir(), 'appointment-events.db')
+)
+EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.5))
+
+# Events buffered per subscriber before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+
+# Seconds between keep-alive comments on idle event streams
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15))
+# Seconds a stream stays open before it is closed and the client reconnects,
+# so connections are spread over workers and dead ones do not pile up
+SSE_MAX_AGE = float(os.environ.get('SSE_MAX_AGE', 300))
+# Milliseconds EventSource waits before reconnecting
+SSE_RETRY_MS = 5000
+
+
+def sse_message(event):
+    """One Server-Sent Events message for a hub event"""
+    return f"id: {event.get('seq', '')}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+class LocalBackend:
+    """Delivers published events straight to this process's hub"""
+
+    def __init__(self):
+        self._dispatch = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, event):
+        with self._lock:
+            self._sequence += 1
+            event = dict(event, seq=self._sequence)
+        if self._dispatch is not None:
+            self._dispatch(event)
+
+
+class SQLiteBackend:
+    """Cross-worker relay: events are appended to a table every worker polls.
+
+    Stands in for a real broker (Redis pub/sub, PostgreSQL LISTEN/NOTIFY) on
+    a single host and in tests. Rows older than `retention` seconds are pruned.
+    """
+
+    def __init__(self, path=EVENTS_SQLITE_PATH, poll_interval=EVENTS_POLL_INTERVAL, retention=300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._thread = None
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, payload TEXT NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def publish(self, event):
+        self._connection().execute(
+            'INSERT INTO events (created_at, payload) VALUES (?, ?)',
+            (time.time(), json.dumps(event))
+        )
+
+    def start(self, dispatch):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, args=(dispatch,), name='events-poller', daemon=True)
+            self._thread.start()
+
+    def _poll(self, dispatch):
+        conn = self._connection()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+        polls = 0
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = conn.execute(
+                    'SELECT id, payload FROM events WHERE id > ? ORDER BY id', (last_id,)
+                ).fetchall()
+                for event_id, payload in rows:
+                    last_id = event_id
+                    dispatch(dict(json.loads(payload), seq=event_id))
+
+                polls += 1
+                if polls % 100 == 0:
+                    conn.execute('DELETE FROM events WHERE created_at < ?', (time.time() - self.retention,))
+            except sqlite3.Error as e:
+                print(f"Event poller error: {e}")
+
+
+class AsyncSubscription:
+    """Subscriber queue owned by an asyncio event loop.
+
+    Events are handed over with call_soon_threadsafe, so publishers on worker
+    threads never block and the stream itself needs no thread.
+    """
+
+    def __init__(self, loop):
+        self._loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put_nowait(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop has shut down; the stream is gone
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client: replace its backlog with a resync request
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync', 'seq': event.get('seq')})
+
+
+class EventHub:
+    """In-process fan-out of availability events to SSE subscribers"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscribers = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _start_backend(self):
+        # Called with the lock held
+        if not self._started:
+            self.backend.start(self._dispatch)
+            self._started = True
+
+    def subscribe(self):
+        with self._lock:
+            self._start_backend()
+            subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def subscribe_async(self, loop):
+        """subscribe() for a stream served from an asyncio event loop"""
+        with self._lock:
+            self._start_backend()
+            subscription = AsyncSubscription(loop)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def add_listener(self, callback):
+        """Call `callback(event)` for every event, e.g. to keep in-memory state current.
+
+        With the local backend this happens synchronously inside publish();
+        with a relay it also covers events published by other workers.
+        """
+        with self._lock:
+            self._start_backend()
+            self._listeners.append(callback)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event):
+        try:
+            self.backend.publish(event)
+        except Exception as e:
+            # Notifications are best effort; the booking has already committed
+            print(f"Event publish failed: {e}")
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Event listener error: {e}")
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # A stalled client: replace its backlog with a resync request
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait({'type': 'resync', 'seq': event.get('seq')})
+
+
+event_hub = EventHub(SQLiteBackend() if EVENTS_BACKEND == 'sqlite' else LocalBackend())
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def asgi_event_stream(scope, receive, send, hub=event_hub):
+    """ASGI handler serving the hub as Server-Sent Events on the event loop.
+
+    Open streams cost a queue and a task rather than a worker thread. Each
+    stream ends after SSE_MAX_AGE seconds and EventSource reconnects.
+    """
+    loop = asyncio.get_running_loop()
+    subscription = hub.subscribe_async(loop)
+    disconnected = loop.create_task(_wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*'),
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': f'retry: {SSE_RETRY_MS}\n\n'.encode(), 'more_body': True})
+
+        closes_at = loop.time() + SSE_MAX_AGE
+        while True:
+            timeout = min(SSE_HEARTBEAT, closes_at - loop.time())
+            if timeout <= 0:
+                break
+            next_event = loop.create_task(subscription.queue.get())
+            await asyncio.wait({next_event, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                return
+            if next_event.done():
+                chunk = sse_message(next_event.result())
+            else:
+                next_event.cancel()
+                chunk = ': keep-alive\n\n'
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        disconnected.cancel()
+        hub.unsubscribe(subscription)
@@ -0,0 +1,153 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+from models.user import db, IdempotencyKey
+
+# Seconds a stored response is replayed for
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+# Seconds after which an unfinished first request (e.g. its worker died) no
+# longer blocks retries with the same key
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+# Expired keys are purged once every this many new keys
+IDEMPOTENCY_PURGE_EVERY = int(os.environ.get('IDEMPOTENCY_PURGE_EVERY', 500))
+
+MAX_KEY_LENGTH = 255
+
+_new_keys = 0
+
+
+def _digest(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return hashlib.sha256(value).hexdigest()
+
+
+def _error(code, message, status, retry_after=None):
+    response = jsonify({'error': {'code': code, 'message': message}})
+    response.status_code = status
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def purge_expired_keys(now=None):
+    """Delete stored responses older than IDEMPOTENCY_TTL; the caller commits"""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=IDEMPOTENCY_TTL)
+    return db.session.execute(
+        db.delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff)
+    ).rowcount
+
+
+def _lookup_query(key):
+    return db.select(
+        IdempotencyKey.request_hash,
+        IdempotencyKey.status_code,
+        IdempotencyKey.body,
+        IdempotencyKey.created_at
+    ).where(IdempotencyKey.key == key)
+
+
+def _lookup(key):
+    return db.session.execute(_lookup_query(key)).first()
+
+
+def _claim(key, request_hash, now):
+    """Insert an in-progress row for the key; False if another request has it"""
+    global _new_keys
+    try:
+        db.session.execute(db.insert(IdempotencyKey).values(
+            key=key, request_hash=request_hash, status_code=None, body=None, created_at=now
+        ))
+        _new_keys += 1
+        if IDEMPOTENCY_PURGE_EVERY > 0 and _new_keys % IDEMPOTENCY_PURGE_EVERY == 0:
+            purge_expired_keys(now)
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _take_over(key, claimed_at, now):
+    """Restart a claim whose first request never finished; False if someone else did"""
+    taken = db.session.execute(
+        db.update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.created_at == claimed_at)
+        .values(created_at=now, status_code=None, body=None)
+    ).rowcount
+    db.session.commit()
+    return taken == 1
+
+
+def _finish(key, response):
+    # The view has committed or rolled back its own work by now
+    db.session.rollback()
+    if response.status_code >= 500:
+        # Let a retry run the request again
+        db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.key == key))
+    else:
+        db.session.execute(
+            db.update(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .values(status_code=response.status_code, body=response.get_data(as_text=True))
+        )
+    db.session.commit()
+
+
+def idempotent(scope, per_user=False):
+    """Replay the stored response when a request repeats its Idempotency-Key.
+
+    Keys are namespaced by `scope` and, with per_user (below token_required),
+    by the current user. A replay is a single primary key lookup. Reusing a
+    key with a different body is rejected with 422, and a retry that arrives
+    while the first request is still running gets 409. 5xx responses are not
+    stored. Requests without the header are not affected.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            client_key = request.headers.get('Idempotency-Key')
+            if client_key is None:
+                return f(*args, **kwargs)
+            if not client_key or len(client_key) > MAX_KEY_LENGTH:
+                return _error('INVALID_IDEMPOTENCY_KEY',
+                              f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters', 400)
+
+            key_scope = f'{scope}:{args[0].id}' if per_user else scope
+            key = _digest(f'{key_scope}\n{client_key}')
+            request_hash = _digest(request.get_data())
+            now = datetime.utcnow()
+
+            record = _lookup(key)
+            if record is not None and record.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL):
+                db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.key == key))
+                db.session.commit()
+                record = None
+            if record is None and not _claim(key, request_hash, now):
+                record = _lookup(key)
+
+            if record is not None:
+                if record.request_hash != request_hash:
+                    return _error('IDEMPOTENCY_KEY_REUSED',
+                                  'This Idempotency-Key was used with a different request', 422)
+                if record.status_code is not None:
+                    replay = Response(record.body, status=record.status_code, mimetype='application/json')
+                    replay.headers['Idempotent-Replayed'] = 'true'
+                    return replay
+                stale = record.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+                if not stale or not _take_over(key, record.created_at, now):
+                    return _error('IDEMPOTENCY_IN_PROGRESS',
+                                  'A request with this Idempotency-Key is still in progress', 409, 1)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                _finish(key, Response(status=500))
+                raise
+            _finish(key, response)
+            return response
+        return decorated
+    return decorator
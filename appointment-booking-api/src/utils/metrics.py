@@ -0,0 +1,331 @@
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request access log line, written by a background thread
+REQUEST_LOG = os.environ.get('REQUEST_LOG', '1') == '1'
+# Log records buffered for the writer thread; beyond this they are dropped
+# rather than blocking the request
+REQUEST_LOG_QUEUE = int(os.environ.get('REQUEST_LOG_QUEUE', 10000))
+
+# Token required to read /api/metrics (Authorization: Bearer <token>); the
+# endpoint is disabled while it is unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# A statement run this many times by one request is logged as a likely N+1
+# pattern (a query per row); 0 turns the check off
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+# Statements slower than this many milliseconds are logged; 0 turns it off
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+# Also log the database's plan for slow SELECTs (runs an extra EXPLAIN)
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '0') == '1'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Route label for queries issued outside a request (scheduler, CLI)
+BACKGROUND_ROUTE = '<background>'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: ([*entry[0]], entry[1], entry[2]) for key, entry in self._values.items()}
+        for label_values, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                yield f'{self.name}_bucket', _format_labels(self.labels, label_values, le), cumulative
+            yield f'{self.name}_bucket', _format_labels(self.labels, label_values, 'le="+Inf"'), count
+            yield f'{self.name}_sum', _format_labels(self.labels, label_values), total
+            yield f'{self.name}_count', _format_labels(self.labels, label_values), count
+
+
+class Registry:
+    """The metrics of this process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Add a callable returning (name, kind, help, value) tuples at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_number(value)}')
+        for collector in self._collectors:
+            for name, kind, help, value in collector():
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request',
+    labels=('blueprint', 'route', 'method')
+))
+responses = registry.register(Counter(
+    'http_responses_total', 'Responses sent, by status code',
+    labels=('route', 'method', 'status')
+))
+request_queries = registry.register(Histogram(
+    'http_request_db_queries', 'Database queries issued per request',
+    labels=('route', 'method'), buckets=QUERY_COUNT_BUCKETS
+))
+query_duration = registry.register(Histogram(
+    'db_query_duration_seconds', 'Time spent executing database queries',
+    labels=('route',)
+))
+queries = registry.register(Counter(
+    'db_queries_total', 'Database queries executed',
+    labels=('route',)
+))
+repeated_statements = registry.register(Counter(
+    'db_repeated_statements_total', 'Requests that ran one statement QUERY_REPEAT_THRESHOLD or more times',
+    labels=('route',)
+))
+slow_queries = registry.register(Counter(
+    'db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS', labels=('route',)
+))
+dropped_log_records = registry.register(Counter(
+    'request_log_dropped_total', 'Access log lines dropped because the log queue was full'
+))
+
+
+def _route_label():
+    if not has_request_context():
+        return BACKGROUND_ROUTE
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+
+def _one_line(statement, limit=300):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+def explain(conn, statement, parameters):
+    """The plan of an already compiled statement, on a separate DBAPI cursor"""
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        # SQLite rows end with the detail column; PostgreSQL returns one text column
+        return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as e:
+        return f'<EXPLAIN failed: {e}>'
+    finally:
+        cursor.close()
+
+
+def _log(message, *args):
+    if request_log is not None:
+        request_log.info(message, *args)
+    else:
+        print(message % args)
+
+
+def _slow_query(conn, statement, parameters, executemany, elapsed, route):
+    slow_queries.inc(route)
+    plan = ''
+    if SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip()[:6].upper() in ('SELECT', 'WITH'):
+        plan = explain(conn, statement, parameters)
+    _log('slow_query route=%s duration_ms=%.1f statement=%s plan=%s',
+         route, elapsed * 1000, _one_line(statement), plan or '-')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    route = _route_label()
+    queries.inc(route)
+    query_duration.observe(elapsed, route)
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_queries += 1
+        g.metrics_query_time += elapsed
+        if QUERY_REPEAT_THRESHOLD:
+            # Bound parameters are not part of the text, so a query per row repeats it
+            g.metrics_statements[statement] = g.metrics_statements.get(statement, 0) + 1
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        _slow_query(conn, statement, parameters, executemany, elapsed, route)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_log_records.inc()
+
+
+class RequestLog:
+    """Access log whose lines are written to stdout by a background thread.
+
+    The writer thread starts with the first line, so importing the app
+    starts no threads (gunicorn --preload forks after import).
+    """
+
+    def __init__(self, max_queue=REQUEST_LOG_QUEUE):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._listener = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('appointments.requests')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(DroppingQueueHandler(self._queue))
+
+    def _start(self):
+        with self._lock:
+            if self._listener is None:
+                stream = logging.StreamHandler(sys.stdout)
+                stream.setFormatter(logging.Formatter('%(message)s'))
+                self._listener = logging.handlers.QueueListener(self._queue, stream)
+                self._listener.start()
+
+    def info(self, message, *args):
+        if self._listener is None:
+            self._start()
+        self.logger.info(message, *args)
+
+
+request_log = RequestLog() if REQUEST_LOG else None
+
+
+def _record(response_status):
+    elapsed = time.perf_counter() - g.metrics_started
+    route = _route_label()
+    method = request.method
+    request_duration.observe(elapsed, request.blueprint or '', route, method)
+    responses.inc(route, method, str(response_status))
+    request_queries.observe(g.metrics_queries, route, method)
+    if QUERY_REPEAT_THRESHOLD:
+        repeated = [(count, statement) for statement, count in g.metrics_statements.items()
+                    if count >= QUERY_REPEAT_THRESHOLD]
+        if repeated:
+            repeated_statements.inc(route)
+            for count, statement in sorted(repeated, reverse=True):
+                _log('repeated_query method=%s route=%s count=%d statement=%s',
+                     method, route, count, _one_line(statement))
+    if request_log is not None:
+        request_log.info(
+            'method=%s path=%s route=%s status=%s duration_ms=%.1f db_queries=%d db_ms=%.1f',
+            method, request.path, route, response_status, elapsed * 1000,
+            g.metrics_queries, g.metrics_query_time * 1000
+        )
+
+
+def init_metrics(app):
+    """Time every request, count its queries and write the access log line.
+
+    Also logs statements a request repeats QUERY_REPEAT_THRESHOLD times and,
+    with SLOW_QUERY_MS, slow statements (with their plan if SLOW_QUERY_EXPLAIN=1).
+    """
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_query_time = 0.0
+        g.metrics_statements = {}
+
+    # Also runs for the 500 response Flask builds when a view raises
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_started' in g:
+            _record(response.status_code)
+        return response
@@ -0,0 +1,144 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.exc import IntegrityError
+from models.user import db, User, Slot, Booking, IdempotencyKey, ArchivedBooking
+
+# Applied migrations are recorded here, one row per version
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a schema migration; versions must be applied in increasing order"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+    return register
+
+
+def _create_indexes(connection, table, names):
+    for index in table.indexes:
+        if index.name in names:
+            index.create(connection, checkfirst=True)
+
+
+@migration(1, 'Create users, slots and bookings tables')
+def _initial_schema(connection):
+    # checkfirst keeps this a no-op on databases made by the old create_all
+    for table in (User.__table__, Slot.__table__, Booking.__table__):
+        table.create(connection, checkfirst=True)
+
+
+class MigrationError(Exception):
+    """A migration failed; later migrations were not attempted"""
+
+
+class _AlreadyApplied(Exception):
+    """Another process recorded this version first"""
+
+
+def _merge_duplicate_slots(connection):
+    """Keep the lowest id of each start_at and move bookings onto it.
+
+    Databases from before bulk materialization can hold the same slot twice
+    (concurrent per-slot generation), which the unique index would reject.
+    A start time booked on more than one row is a real double booking and
+    is left for an operator to resolve.
+    """
+    slots, bookings = Slot.__table__, Booking.__table__
+    duplicates = connection.execute(
+        select(slots.c.start_at).group_by(slots.c.start_at).having(db.func.count() > 1)
+    ).scalars().all()
+    double_booked = []
+    for start_at in duplicates:
+        slot_ids = connection.execute(
+            select(slots.c.id).where(slots.c.start_at == start_at).order_by(slots.c.id)
+        ).scalars().all()
+        booked = connection.execute(
+            select(db.func.count()).select_from(bookings).where(bookings.c.slot_id.in_(slot_ids))
+        ).scalar()
+        if booked > 1:
+            double_booked.append(start_at.isoformat())
+            continue
+        keep, extra = slot_ids[0], slot_ids[1:]
+        connection.execute(bookings.update().where(bookings.c.slot_id.in_(extra)).values(slot_id=keep))
+        connection.execute(slots.delete().where(slots.c.id.in_(extra)))
+    if double_booked:
+        raise RuntimeError(
+            f"Slots booked more than once at {', '.join(double_booked)}; "
+            "cancel the extra bookings and run the migration again"
+        )
+    return len(duplicates)
+
+
+@migration(2, 'Index slot start times and booking listings')
+def _hot_query_indexes(connection):
+    _merge_duplicate_slots(connection)
+    _create_indexes(connection, Slot.__table__, {'ix_slots_start_at'})
+    _create_indexes(connection, Booking.__table__, {
+        'ix_bookings_created_at_id',
+        'ix_bookings_user_id_created_at',
+    })
+
+
+@migration(3, 'Store responses for Idempotency-Key requests')
+def _idempotency_keys(connection):
+    IdempotencyKey.__table__.create(connection, checkfirst=True)
+
+
+@migration(4, 'Archive table for past bookings')
+def _bookings_archive(connection):
+    ArchivedBooking.__table__.create(connection, checkfirst=True)
+
+
+def current_version(connection):
+    schema_version.create(connection, checkfirst=True)
+    return connection.execute(select(db.func.max(schema_version.c.version))).scalar() or 0
+
+
+def pending_migrations():
+    """Migrations not yet applied to the configured database"""
+    with db.engine.begin() as connection:
+        version = current_version(connection)
+    return [item for item in MIGRATIONS if item[0] > version]
+
+
+def run_migrations():
+    """Apply pending migrations, each in its own transaction.
+
+    Returns the list of versions applied. A migration another process
+    finished first is detected by the version row's primary key and skipped.
+    Any other failure raises MigrationError and stops the run, so no later
+    version is recorded over a migration that did not apply.
+    """
+    applied = []
+    for version, description, fn in pending_migrations():
+        try:
+            with db.engine.begin() as connection:
+                if current_version(connection) >= version:
+                    continue
+                try:
+                    fn(connection)
+                except Exception as e:
+                    raise MigrationError(f"Migration {version} ({description}) failed: {e}") from e
+                try:
+                    connection.execute(schema_version.insert().values(
+                        version=version,
+                        description=description,
+                        applied_at=datetime.utcnow()
+                    ))
+                except IntegrityError as e:
+                    # Rolls back this copy of the migration
+                    raise _AlreadyApplied() from e
+        except _AlreadyApplied:
+            continue
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
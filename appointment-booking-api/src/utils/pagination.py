@@ -0,0 +1,31 @@
+import base64
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque token"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token back to (created_at, id); raises ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_limit(value):
+    """Parse a page size, clamped to MAX_PAGE_SIZE; raises ValueError"""
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
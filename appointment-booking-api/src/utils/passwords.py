@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# werkzeug method string: 'pbkdf2:sha256[:iterations]' or 'scrypt[:n:r:p]'
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+# Processes used for hashing per worker; 0 hashes inline on the request thread
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+
+# Hash operations allowed in flight per worker before new ones are refused
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', max(PASSWORD_HASH_WORKERS, 1) * 4))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+# Seconds clients are told to wait (Retry-After) when hashing is refused
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 2))
+
+_DEFAULT_PARAMETERS = {
+    'pbkdf2': ['sha256', '600000'],
+    'scrypt': ['32768', '8', '1'],
+}
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool already has PASSWORD_HASH_QUEUE jobs in flight,
+    or a job did not finish within PASSWORD_HASH_TIMEOUT"""
+
+    retry_after = PASSWORD_HASH_RETRY_AFTER
+
+
+def normalize_method(method):
+    """Expand a method string with werkzeug's defaults so stored hashes compare equal"""
+    parts = method.split(':')
+    defaults = _DEFAULT_PARAMETERS.get(parts[0], [])
+    return ':'.join(parts + defaults[len(parts) - 1:])
+
+
+_method = normalize_method(PASSWORD_HASH_METHOD)
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # The pool is created lazily inside a worker whose other threads
+                # may hold locks; forking that process would copy them held
+                # into the children, so start them from a clean process instead
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context(start_method)
+                )
+    return _pool
+
+
+def _release_slot(future):
+    _slots.release()
+
+
+def _run(fn, *args):
+    """Run a hashing function in the pool, bounded by PASSWORD_HASH_QUEUE.
+
+    A slot stays taken until the job itself finishes, also when the caller
+    stopped waiting for it, so the bound holds under load.
+    """
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy('Too many password hashing operations in progress')
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(_release_slot)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        # Frees the slot now if the job has not started yet
+        future.cancel()
+        raise HashingBusy('Password hashing timed out')
+
+
+def hash_password(password):
+    """Hash a password with the configured algorithm and cost"""
+    return _run(generate_password_hash, password, _method)
+
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash of any supported method"""
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with a different algorithm or cost"""
+    return password_hash.split('$', 1)[0] != _method
@@ -0,0 +1,77 @@
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Most statements each endpoint may run in one request, with a cold user cache
+# and no availability index (the database path). Raising one of these should
+# be a deliberate decision, not a side effect.
+ROUTE_BUDGETS = {
+    'GET /api/slots': 3,
+    'GET /api/my-bookings': 2,
+    'GET /api/all-bookings': 3,
+    'POST /api/book': 6,
+    'DELETE /api/cancel': 3,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more statements than its budget allows"""
+
+
+class QueryCounter:
+    """Context manager recording the statements this thread runs on any engine.
+
+    Statements from other threads (scheduler, index rebuilds) are not counted,
+    so it can wrap a Flask test client request.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._thread = None
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        event.listen(Engine, 'after_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'after_cursor_execute', self._record)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def repeated(self, threshold=2):
+        """(count, statement) for statements run at least `threshold` times"""
+        counts = {}
+        for statement in self.statements:
+            counts[statement] = counts.get(statement, 0) + 1
+        return sorted(((count, statement) for statement, count in counts.items() if count >= threshold),
+                      reverse=True)
+
+
+def _over_budget(method, path, counter, budget):
+    lines = [f'{method} {path} ran {len(counter)} statements, budget {budget}']
+    lines += [f'  repeated {count}x: {" ".join(statement.split())}' for count, statement in counter.repeated()]
+    lines += [f'  {" ".join(statement.split())}' for statement in counter.statements]
+    return '\n'.join(lines)
+
+
+def assert_query_budget(client, method, path, budget=None, route=None, **kwargs):
+    """Make a test client request and fail if it runs more than `budget` statements.
+
+    `budget` defaults to ROUTE_BUDGETS[route or 'METHOD path']. The failure
+    message lists the statements and any that repeat (likely N+1). Returns
+    the response.
+    """
+    if budget is None:
+        budget = ROUTE_BUDGETS[route or f'{method} {path.split("?")[0]}']
+    with QueryCounter() as counter:
+        response = client.open(path, method=method, **kwargs)
+    if len(counter) > budget:
+        raise QueryBudgetExceeded(_over_budget(method, path, counter, budget))
+    return response
+
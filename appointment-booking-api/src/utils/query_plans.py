@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import configure_mappers
+from models.user import db, Slot
+
+# Representative parameter values; plans do not depend on them
+_SAMPLE_DAY = datetime(2030, 1, 7)
+
+
+def _admin_filters(archived=False, **args):
+    """_booking_filters() for the given query parameters"""
+    from routes.bookings import _booking_filters
+    with current_app.test_request_context(query_string=args):
+        return _booking_filters(archived)
+
+
+def _hot_queries():
+    """(name, ordered, statement) tuples for the queries behind the hot endpoints.
+
+    Statements come from the same helpers the routes and jobs execute, so a
+    change to a route's query is checked as it ships. `ordered` marks
+    unfiltered, LIMITed listings where walking an index in sort order is
+    the intended plan; every other query must seek.
+    """
+    from routes.auth import _user_by_email
+    from routes.bookings import _my_bookings_query, _listing_query, _count_query, _booking_with_slot
+    from routes.slots import _free_slots_query, _first_free_query, FREE_SLOT_COLUMNS
+    from utils.archive import _archivable_bookings_query, _past_free_slots_query
+    from utils.bookings import _free_slot_source
+    from utils.idempotency import _lookup_query
+    from utils.slot_index import _rebuild_query
+    from utils.slots import booked_starts_query
+
+    # Backrefs such as Booking.slot exist once the mappers are configured,
+    # which in the app happens on the first query
+    configure_mappers()
+    day_end = _SAMPLE_DAY + timedelta(days=1)
+    page = (_SAMPLE_DAY, 1)
+    by_user = _admin_filters(user_id='1')
+    by_slot_date = _admin_filters(slot_from=f'{_SAMPLE_DAY:%Y-%m-%d}', slot_to=f'{_SAMPLE_DAY:%Y-%m-%d}')
+    return [
+        ('GET /api/slots', False, _free_slots_query(_SAMPLE_DAY, _SAMPLE_DAY, *FREE_SLOT_COLUMNS)),
+        ('GET /api/slots?format=compact', False, _free_slots_query(_SAMPLE_DAY, _SAMPLE_DAY, Slot.id, Slot.start_at)),
+        ('GET /api/slots (virtual)', False, booked_starts_query(_SAMPLE_DAY, day_end)),
+        ('GET /api/slots/first-available', False, _first_free_query(_SAMPLE_DAY, *FREE_SLOT_COLUMNS)),
+        ('slot index rebuild', False, _rebuild_query(_SAMPLE_DAY, day_end)),
+        ('POST /api/book', False, _free_slot_source(1, 1)),
+        ('POST /api/login', False, _user_by_email('admin@example.com')),
+        ('GET /api/my-bookings', False, _my_bookings_query(1)),
+        ('GET /api/my-bookings?archived=1', False, _my_bookings_query(1, archived=True)),
+        ('GET /api/all-bookings', True, _listing_query(False, [], limit=100)),
+        ('GET /api/all-bookings (next page)', True, _listing_query(False, [], page, 100)),
+        ('GET /api/all-bookings (by user)', False, _listing_query(False, by_user, limit=100)),
+        ('GET /api/all-bookings (by user, total)', False, _count_query(False, by_user)),
+        ('GET /api/all-bookings (by slot date)', False, _listing_query(False, by_slot_date, limit=100)),
+        ('GET /api/all-bookings?archived=1', True, _listing_query(True, [], limit=100)),
+        ('GET /api/all-bookings?archived=1 (next page)', True, _listing_query(True, [], page, 100)),
+        ('GET /api/all-bookings?archived=1 (by user)', False,
+         _listing_query(True, _admin_filters(True, user_id='1'), limit=100)),
+        ('GET /api/all-bookings?archived=1 (by slot date)', False, _listing_query(True, _admin_filters(
+            True, slot_from=f'{_SAMPLE_DAY:%Y-%m-%d}', slot_to=f'{_SAMPLE_DAY:%Y-%m-%d}'
+        ), limit=100)),
+        ('archive job, bookings', False, _archivable_bookings_query(_SAMPLE_DAY, 1000)),
+        ('archive job, free slots', False, _past_free_slots_query(_SAMPLE_DAY, 1000)),
+        ('DELETE /api/cancel', False, _booking_with_slot(1)),
+        ('Idempotency-Key replay', False, _lookup_query('k')),
+    ]
+
+
+def _sqlite_full_scans(rows, ordered):
+    # EXPLAIN QUERY PLAN rows are (id, parent, notused, detail). A bare
+    # "SCAN <table>" reads every row; "SCAN <table> USING INDEX" reads every
+    # index entry, which is only fine when a LIMIT stops the walk early.
+    return [
+        row[3] for row in rows
+        if row[3].startswith('SCAN ') and (' INDEX' not in row[3] or not ordered)
+    ]
+
+
+def _postgres_full_scans(rows):
+    scans = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan':
+            scans.append(f"Seq Scan on {node.get('Relation Name')}")
+        for child in node.get('Plans', []):
+            walk(child)
+
+    plan = rows[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    walk(plan[0]['Plan'])
+    return scans
+
+
+def explain(connection, statement):
+    """Run EXPLAIN for a statement on the connection and return the raw plan rows"""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN (FORMAT JSON) '
+
+    def add_prefix(conn, cursor, sql, parameters, context, executemany):
+        return prefix + sql, parameters
+
+    event.listen(connection, 'before_cursor_execute', add_prefix, retval=True)
+    try:
+        return connection.execute(statement).cursor.fetchall()
+    finally:
+        event.remove(connection, 'before_cursor_execute', add_prefix)
+
+
+def check_query_plans():
+    """Explain every hot query and return (name, detail) for each full table scan.
+
+    On PostgreSQL sequential scans are disabled for the check so that an
+    empty or tiny table does not hide a missing index.
+    """
+    failures = []
+    with db.engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            connection.exec_driver_sql('SET enable_seqscan = off')
+        for name, ordered, statement in _hot_queries():
+            rows = explain(connection, statement)
+            if dialect == 'sqlite':
+                scans = _sqlite_full_scans(rows, ordered)
+            elif dialect == 'postgresql':
+                scans = _postgres_full_scans(rows)
+            else:
+                scans = []
+            failures.extend((name, detail) for detail in scans)
+        connection.rollback()
+    return failures
@@ -0,0 +1,253 @@
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+from flask import jsonify, request
+import jwt
+from utils.auth import SECRET_KEY
+from utils.database import DB_POOL_SIZE, DB_MAX_OVERFLOW
+from utils.metrics import registry, Counter
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+
+# 'memory' keeps buckets in this process; 'sqlite' shares them between the
+# workers on one host through a file. Any object with the same take() method
+# (e.g. backed by Redis) can be installed with set_backend(); it must charge a
+# request's buckets all together or not at all.
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SQLITE_PATH = os.environ.get(
+    'RATE_LIMIT_SQLITE_PATH',
+    os.path.join(tempfile.gettempdir(), 'appointment-ratelimit.db')
+)
+# Upper bound on buckets kept by the memory backend
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+
+# Number of reverse proxies in front of the app whose X-Forwarded-For entries
+# can be trusted; 0 uses the socket address
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 0))
+
+
+def _rule(name, default):
+    """Parse RATE_LIMIT_<NAME> as '<requests>/<seconds>'; '0' turns the rule off"""
+    value = os.environ.get(f'RATE_LIMIT_{name}', default)
+    if value in ('', '0'):
+        return None
+    requests, seconds = value.split('/')
+    return int(requests), float(seconds)
+
+
+# Per endpoint: the buckets to charge, as (scope, (capacity, period seconds))
+RATE_LIMITS = {
+    'login': [('ip', _rule('LOGIN_IP', '20/60')), ('email', _rule('LOGIN_EMAIL', '5/60'))],
+    'register': [('ip', _rule('REGISTER_IP', '5/600'))],
+    'book': [('ip', _rule('BOOK_IP', '60/60')), ('user', _rule('BOOK_USER', '20/60'))],
+}
+
+# Requests each endpoint may have in progress per worker process before new
+# ones are turned away; booking is bounded by the DB connection pool
+CONCURRENCY_LIMITS = {
+    'login': int(os.environ.get('CONCURRENCY_LIMIT_LOGIN', 16)),
+    'register': int(os.environ.get('CONCURRENCY_LIMIT_REGISTER', 8)),
+    'book': int(os.environ.get('CONCURRENCY_LIMIT_BOOK', DB_POOL_SIZE + DB_MAX_OVERFLOW)),
+}
+
+rejected = registry.register(Counter(
+    'admission_rejected_total', 'Requests turned away before doing any work',
+    labels=('endpoint', 'reason')
+))
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _waits(state):
+    # Seconds until each (key, tokens, capacity, rate) bucket holds a token
+    return [0 if tokens >= 1 else (1 - tokens) / rate for _, tokens, _, rate in state]
+
+
+class MemoryBackend:
+    """Token buckets private to this process"""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        """Take one token from each (key, capacity, period) bucket, or from none.
+
+        Returns the seconds each bucket needs until it has a token; all 0 if
+        the request may proceed and was charged.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = []
+            for key, capacity, period in buckets:
+                rate = capacity / period
+                bucket = self._buckets.get(key)
+                tokens = _refill(bucket[0], bucket[1], now, capacity, rate) if bucket else capacity
+                state.append((key, tokens, capacity, rate))
+            waits = _waits(state)
+            charge = not any(waits)
+            for key, tokens, capacity, rate in state:
+                if charge:
+                    tokens -= 1
+                # Third field: when the bucket is full again and can be forgotten
+                self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+            return waits
+
+    def _evict(self, now):
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        if len(self._buckets) > self.max_keys:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """Token buckets shared by every worker on the host through a SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, buckets):
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            # A broken limiter must not take the endpoint down with it
+            print(f"Rate limit store unavailable, allowing request: {e}")
+            return [0] * len(buckets)
+        try:
+            state = []
+            for key, capacity, period in buckets:
+                rate = capacity / period
+                row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = _refill(row[0], row[1], now, capacity, rate) if row else capacity
+                state.append((key, tokens, capacity, rate))
+            waits = _waits(state)
+            charge = not any(waits)
+            for key, tokens, capacity, rate in state:
+                connection.execute(
+                    'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                    (key, tokens - 1 if charge else tokens, now)
+                )
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                # Drop buckets untouched for a day
+                connection.execute('DELETE FROM buckets WHERE updated < ?', (now - 86400,))
+            connection.execute('COMMIT')
+        except sqlite3.Error as e:
+            connection.execute('ROLLBACK')
+            print(f"Rate limit store error, allowing request: {e}")
+            return [0] * len(buckets)
+        return waits
+
+
+backend = SQLiteBackend(RATE_LIMIT_SQLITE_PATH) if RATE_LIMIT_BACKEND == 'sqlite' else MemoryBackend()
+
+
+def set_backend(new_backend):
+    """Replace the bucket store, e.g. with a shared one in tests or production"""
+    global backend
+    backend = new_backend
+
+
+def client_ip():
+    """The client address, looking through RATE_LIMIT_TRUSTED_PROXIES proxies"""
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+
+def _token_user_id():
+    # Only the signature is checked; token_required does the full validation
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    try:
+        return jwt.decode(auth_header[7:], SECRET_KEY, algorithms=['HS256']).get('user_id')
+    except jwt.InvalidTokenError:
+        return None
+
+
+def _request_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+_KEY_FUNCTIONS = {'ip': client_ip, 'user': _token_user_id, 'email': _request_email}
+
+
+def _rejection(code, message, status, retry_after):
+    response = jsonify({'error': {'code': code, 'message': message}})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission(endpoint):
+    """Apply the endpoint's rate limits and concurrency bound before the view runs.
+
+    Place it above token_required so rejected requests cost no database
+    lookup or password hashing. Over the rate: 429; too many in progress: 503.
+    Both carry Retry-After.
+    """
+    rules = [(scope, rule) for scope, rule in RATE_LIMITS[endpoint] if rule]
+    limit = CONCURRENCY_LIMITS[endpoint]
+    in_flight = threading.BoundedSemaphore(limit) if limit > 0 else None
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                scopes, buckets = [], []
+                for scope, (capacity, period) in rules:
+                    value = _KEY_FUNCTIONS[scope]()
+                    if value is not None:
+                        scopes.append(scope)
+                        buckets.append((f'{endpoint}:{scope}:{value}', capacity, period))
+                # Checked together so a request refused by one bucket is not
+                # charged to the others
+                waits = backend.take(buckets) if buckets else []
+                if any(waits):
+                    scope = next(scope for scope, wait in zip(scopes, waits) if wait)
+                    rejected.inc(endpoint, f'rate_{scope}')
+                    return _rejection(
+                        'RATE_LIMITED', 'Too many requests, please retry later', 429, max(waits)
+                    )
+
+            if in_flight is None:
+                return f(*args, **kwargs)
+            if not in_flight.acquire(blocking=False):
+                rejected.inc(endpoint, 'concurrency')
+                return _rejection('SERVER_BUSY', 'Too many requests in progress, please retry', 503, 1)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                in_flight.release()
+        return decorated
+    return decorator
@@ -0,0 +1,168 @@
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from models.user import Slot, db
+from utils.slots import materialize_slots
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory file locks, every process runs its own job
+    fcntl = None
+
+SLOT_HORIZON_DAYS = int(os.environ.get('SLOT_HORIZON_DAYS', 60))
+SLOT_SCHEDULER_INTERVAL = int(os.environ.get('SLOT_SCHEDULER_INTERVAL', 3600))
+SLOT_SCHEDULER_LOCK = os.environ.get(
+    'SLOT_SCHEDULER_LOCK',
+    os.path.join(tempfile.gettempdir(), 'appointment-slot-scheduler.lock')
+)
+
+# Slots are only ever materialized in whole days running on from the current
+# horizon, so the day of the latest slot in the database is the horizon: every
+# day from today through it exists. This is a cache of that day, re-read when
+# a request goes past it, so other workers and restarts see the same horizon.
+_horizon = None
+_horizon_lock = threading.Lock()
+
+
+def _today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _advance_horizon(end_date):
+    """Record that every day through end_date is materialized"""
+    global _horizon
+    with _horizon_lock:
+        if _horizon is None or end_date > _horizon:
+            _horizon = end_date
+
+
+def materialized_horizon(to_date):
+    """Last materialized day, from the database when to_date is past the cached one"""
+    if _horizon is None or to_date > _horizon:
+        latest = db.session.execute(db.select(db.func.max(Slot.start_at))).scalar()
+        if latest is not None:
+            _advance_horizon(latest.replace(hour=0, minute=0, second=0, microsecond=0))
+    return _horizon
+
+
+def extend_horizon(days=SLOT_HORIZON_DAYS):
+    """Materialize slots from today through `days` days ahead and commit"""
+    start_date = _today()
+    end_date = start_date + timedelta(days=days)
+    created = materialize_slots(start_date, end_date)
+    db.session.commit()
+    _advance_horizon(end_date)
+    return created
+
+
+def ensure_materialized(to_date):
+    """Generate slots on demand for the days between the horizon and to_date.
+
+    Dates inside the horizon (and past dates) are left untouched, so the
+    common request path performs no writes. Every day after the horizon is
+    generated, not only the requested range, so no day is skipped. Returns
+    the number of slots created.
+    """
+    today = _today()
+    horizon = materialized_horizon(to_date)
+    if horizon is None or horizon < today:
+        horizon = today - timedelta(days=1)
+    if to_date <= horizon:
+        return 0
+
+    start_date = horizon + timedelta(days=1)
+    created = materialize_slots(start_date, to_date)
+    if created:
+        db.session.commit()
+    _advance_horizon(to_date)
+    return created
+
+
+class PeriodicJob:
+    """Periodic in-process job that one process at a time runs.
+
+    Every worker starts one, but only the process holding the lock file runs
+    the job; the others retry on each tick and take over if the holder exits.
+    Subclasses implement job(), which runs inside an app context.
+    """
+
+    name = 'periodic-job'
+    label = 'Periodic job'
+
+    def __init__(self, app, interval, lock_path):
+        self.app = app
+        self.interval = interval
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _acquire(self):
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def job(self):
+        raise NotImplementedError
+
+    def run_once(self):
+        """Run the job if this process holds the runner lock"""
+        if not self._acquire():
+            return None
+        with self.app.app_context():
+            try:
+                return self.job()
+            except Exception as e:
+                db.session.rollback()
+                print(f"{self.label} error: {e}")
+                return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        # Called on every request; only the first call starts the thread
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class SlotHorizonScheduler(PeriodicJob):
+    """Periodic job keeping slots materialized SLOT_HORIZON_DAYS ahead"""
+
+    name = 'slot-horizon-scheduler'
+    label = 'Slot scheduler'
+
+    def __init__(self, app, days=SLOT_HORIZON_DAYS, interval=SLOT_SCHEDULER_INTERVAL,
+                 lock_path=SLOT_SCHEDULER_LOCK):
+        super().__init__(app, interval, lock_path)
+        self.days = days
+
+    def job(self):
+        created = extend_horizon(self.days)
+        if created:
+            print(f"Slot scheduler materialized {created} slots")
+        return created
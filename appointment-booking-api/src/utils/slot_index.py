@@ -0,0 +1,320 @@
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from models.user import Slot, Booking, db
+from utils.events import event_hub
+from utils.scheduler import SLOT_HORIZON_DAYS
+from utils.slots import (
+    VIRTUAL_SLOTS, DAY_START_HOUR, DAY_END_HOUR, SLOT_MINUTES,
+    booked_starts_query, is_scheduled, virtual_slot_id, virtual_slot_start
+)
+
+# Days from today held in memory; queries reaching further go to the database
+SLOT_INDEX_DAYS = int(os.environ.get('SLOT_INDEX_DAYS', SLOT_HORIZON_DAYS + 1))
+# Seconds between rebuilds from the database. They pick up newly materialized
+# slots and any booking whose event did not reach this worker.
+SLOT_INDEX_RECONCILE_INTERVAL = float(os.environ.get('SLOT_INDEX_RECONCILE_INTERVAL', 30))
+# Answer POST /api/book with 409 straight from the index when it has the slot
+# as booked. With several workers and the 'local' events backend, a slot freed
+# by another worker may be refused until the next rebuild; use
+# EVENTS_BACKEND=sqlite or turn this off there.
+SLOT_INDEX_REJECT_BOOKED = os.environ.get('SLOT_INDEX_REJECT_BOOKED', '1') == '1'
+
+SLOTS_PER_DAY = (DAY_END_HOUR - DAY_START_HOUR) * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+# Smallest array item holding one bit per slot of a day ('H' for 16 slots)
+MASK_TYPECODE = next((code for code in 'HIQ' if array(code).itemsize * 8 >= SLOTS_PER_DAY), None)
+
+# Off when turned off or when a day has more slots than the widest mask holds
+SLOT_INDEX_ENABLED = os.environ.get('SLOT_INDEX_ENABLED', '1') == '1' and MASK_TYPECODE is not None
+
+# Offset of each slot of the grid from midnight
+_SLOT_OFFSETS = [
+    timedelta(hours=DAY_START_HOUR, minutes=bit * SLOT_MINUTES) for bit in range(SLOTS_PER_DAY)
+]
+_SLOT_LENGTH = timedelta(minutes=SLOT_MINUTES)
+
+
+def _rebuild_query(start, end):
+    """Materialized slots starting in [start, end) with their booking id, if any"""
+    return db.select(Slot.id, Slot.start_at, Slot.created_at, Booking.id).outerjoin(
+        Booking, Booking.slot_id == Slot.id
+    ).where(Slot.start_at >= start, Slot.start_at < end)
+
+
+def _today():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class _Window:
+    """Slot state for `days` days from `base`: per day a bitmask of slots that
+    exist and one of slots that are booked, plus per slot its row id and
+    created_at (materialized mode only)"""
+
+    def __init__(self, base, days):
+        self.base = base
+        self.days = days
+        self.present = array(MASK_TYPECODE, [FULL_DAY if VIRTUAL_SLOTS else 0]) * days
+        self.booked = array(MASK_TYPECODE, [0]) * days
+        self.ids = array('q', [0]) * (days * SLOTS_PER_DAY)
+        self.created = [None] * (days * SLOTS_PER_DAY)
+        self.positions = {}
+        # Slot dicts are built on first use and shared by later listings
+        self._dicts = [None] * (days * SLOTS_PER_DAY)
+
+    def position(self, slot_start):
+        if not is_scheduled(slot_start):
+            return None
+        day = (slot_start - self.base).days
+        if not 0 <= day < self.days:
+            return None
+        minutes = (slot_start.hour - DAY_START_HOUR) * 60 + slot_start.minute
+        return day * SLOTS_PER_DAY + minutes // SLOT_MINUTES
+
+    def add(self, position, slot_id, created_at, booked):
+        day, bit = divmod(position, SLOTS_PER_DAY)
+        self.present[day] |= 1 << bit
+        self.ids[position] = slot_id
+        self.created[position] = created_at.isoformat() if created_at else None
+        self.positions[slot_id] = position
+        self.set_booked(position, booked)
+
+    def set_booked(self, position, booked):
+        day, bit = divmod(position, SLOTS_PER_DAY)
+        if booked:
+            self.booked[day] |= 1 << bit
+        else:
+            self.booked[day] &= ~(1 << bit)
+
+    def slot_dict(self, position):
+        """The free slot at a position in Slot.to_dict form; callers must not modify it"""
+        slot = self._dicts[position]
+        if slot is None:
+            day, bit = divmod(position, SLOTS_PER_DAY)
+            slot_start = self.base + timedelta(days=day) + _SLOT_OFFSETS[bit]
+            slot = self._dicts[position] = {
+                'id': virtual_slot_id(slot_start) if VIRTUAL_SLOTS else self.ids[position],
+                'start_at': slot_start.isoformat(),
+                'end_at': (slot_start + _SLOT_LENGTH).isoformat(),
+                'is_booked': False,
+                'created_at': self.created[position]
+            }
+        return slot
+
+
+class AvailabilityIndex:
+    """Booked/free state of the upcoming slots, held in memory as one bitmask per day.
+
+    Built from the database when the worker serves its first request and
+    rebuilt every SLOT_INDEX_RECONCILE_INTERVAL seconds. In between it follows
+    the booked/freed events that availability_changed() publishes after each
+    commit. Queries return None when the index cannot answer them (not built
+    yet, a range outside the window, days not fully materialized) and the
+    caller falls back to the database.
+    """
+
+    def __init__(self, days=SLOT_INDEX_DAYS, interval=SLOT_INDEX_RECONCILE_INTERVAL):
+        self.days = days
+        self.interval = interval
+        self.app = None
+        self._window = None
+        # Events seen while a rebuild reads the database, replayed onto its result
+        self._journal = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._built_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, app):
+        # Called on every request; only the first call starts the thread
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self.app = app
+                    event_hub.add_listener(self.apply_event)
+                    self._thread = threading.Thread(target=self._run, name='slot-index', daemon=True)
+                    self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Slot index rebuild failed: {e}")
+            self._stop.wait(self.interval)
+
+    def reconcile(self):
+        """Rebuild the window from the database (needs an app context)"""
+        window = _Window(_today(), self.days)
+        end = window.base + timedelta(days=window.days)
+        with self._lock:
+            self._journal = []
+        try:
+            if VIRTUAL_SLOTS:
+                booked = db.session.execute(booked_starts_query(window.base, end)).scalars()
+                for slot_start in booked:
+                    position = window.position(slot_start)
+                    if position is not None:
+                        window.set_booked(position, True)
+            else:
+                rows = db.session.execute(_rebuild_query(window.base, end))
+                for slot_id, slot_start, created_at, booking_id in rows:
+                    position = window.position(slot_start)
+                    if position is not None:
+                        window.add(position, slot_id, created_at, booking_id is not None)
+            db.session.commit()
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            for slot_start, booked in self._journal:
+                position = window.position(slot_start)
+                if position is not None:
+                    window.set_booked(position, booked)
+            self._journal = None
+            self._window = window
+            self._built_at = time.time()
+
+    def apply_event(self, event):
+        """Event hub listener: flip the bits of booked and freed slots"""
+        if event.get('type') not in ('booked', 'freed'):
+            return
+        booked = event['type'] == 'booked'
+        for slot in event.get('slots', ()):
+            try:
+                slot_start = datetime.fromisoformat(slot['start_at'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            with self._lock:
+                if self._journal is not None:
+                    self._journal.append((slot_start, booked))
+                window = self._window
+                position = window.position(slot_start) if window is not None else None
+                if position is not None:
+                    window.set_booked(position, booked)
+
+    def _count(self, answered):
+        if answered:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _free_masks(self, window, from_date, to_date):
+        """(day, free mask) for each day from from_date through to_date, or
+        None when the window does not fully cover the range"""
+        if window is None:
+            return None
+        first_day = (from_date.replace(hour=0, minute=0, second=0, microsecond=0) - window.base).days
+        last_day = (to_date.replace(hour=0, minute=0, second=0, microsecond=0) - window.base).days
+        if first_day < 0 or last_day >= window.days:
+            return None
+        if any(window.present[day] != FULL_DAY for day in range(first_day, last_day + 1)):
+            return None
+
+        masks = []
+        for day in range(first_day, last_day + 1):
+            free = FULL_DAY & ~window.booked[day]
+            if day == first_day:
+                # Drop slots of the first day that start before from_date
+                day_start = window.base + timedelta(days=day)
+                free &= sum(1 << bit for bit, offset in enumerate(_SLOT_OFFSETS) if day_start + offset >= from_date)
+            masks.append((day, free))
+        return masks
+
+    @staticmethod
+    def _bits(mask):
+        while mask:
+            yield (mask & -mask).bit_length() - 1
+            mask &= mask - 1
+
+    def free_slots(self, from_date, to_date):
+        """Free slots from from_date through the whole of to_date, like free_slots()"""
+        window = self._window
+        masks = self._free_masks(window, from_date, to_date)
+        self._count(masks is not None)
+        if masks is None:
+            return None
+        return [
+            window.slot_dict(day * SLOTS_PER_DAY + bit)
+            for day, free in masks
+            for bit in self._bits(free)
+        ]
+
+    def free_days(self, from_date, to_date):
+        """The same range as (date, free mask, slot ids) per day for compact_listing()"""
+        window = self._window
+        masks = self._free_masks(window, from_date, to_date)
+        self._count(masks is not None)
+        if masks is None:
+            return None
+        days = []
+        for day, free in masks:
+            day_start = window.base + timedelta(days=day)
+            if VIRTUAL_SLOTS:
+                ids = [virtual_slot_id(day_start + _SLOT_OFFSETS[bit]) for bit in self._bits(free)]
+            else:
+                ids = [window.ids[day * SLOTS_PER_DAY + bit] for bit in self._bits(free)]
+            days.append((day_start.date(), free, ids))
+        return days
+
+    def first_available(self, after=None):
+        """Earliest free slot starting at or after `after` (default now), or None
+        when there is none inside the window or the index cannot tell"""
+        window = self._window
+        after = after or datetime.now()
+        if window is None:
+            self._count(False)
+            return None
+        day = max(0, (after - window.base).days)
+        while day < window.days and window.present[day] == FULL_DAY:
+            free = FULL_DAY & ~window.booked[day]
+            day_start = window.base + timedelta(days=day)
+            for bit in self._bits(free):
+                if day_start + _SLOT_OFFSETS[bit] >= after:
+                    self._count(True)
+                    return window.slot_dict(day * SLOTS_PER_DAY + bit)
+            day += 1
+        self._count(False)
+        return None
+
+    def is_booked(self, slot_id):
+        """True only when the index has the slot as booked; False when it does not know"""
+        window = self._window
+        if window is None:
+            return False
+        if VIRTUAL_SLOTS:
+            slot_start = virtual_slot_start(slot_id)
+            position = window.position(slot_start) if slot_start else None
+        else:
+            try:
+                position = window.positions.get(int(slot_id))
+            except (TypeError, ValueError):
+                return False
+        if position is None:
+            return False
+        day, bit = divmod(position, SLOTS_PER_DAY)
+        return bool(window.booked[day] >> bit & 1)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'age': time.time() - self._built_at if self._built_at else 0.0,
+        }
+
+
+# Answers nothing until started (see SLOT_INDEX_ENABLED in create_app)
+availability_index = AvailabilityIndex()
@@ -0,0 +1,251 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models.user import Slot, Booking, db
+
+# Daily schedule: 30-minute slots from 9:00 to 17:00
+DAY_START_HOUR = 9
+DAY_END_HOUR = 17
+SLOT_MINUTES = 30
+
+# 'materialized' stores a row for every slot; 'virtual' computes free slots
+# from the schedule and only persists a Slot row once it is booked
+SLOT_MODE = os.environ.get('SLOT_MODE', 'materialized')
+VIRTUAL_SLOTS = SLOT_MODE == 'virtual'
+
+# `format` value of the column-wise /api/slots listing
+COMPACT_FORMAT = 'slots-compact-v1'
+
+# Virtual slot ids count SLOT_MINUTES periods since this instant
+SLOT_EPOCH = datetime(2000, 1, 1)
+
+
+def iter_slot_starts(start_date, end_date):
+    """Yield the start time of every scheduled slot between two dates (inclusive)"""
+    step = timedelta(minutes=SLOT_MINUTES)
+    current_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    last_date = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    while current_date <= last_date:
+        slot_start = current_date.replace(hour=DAY_START_HOUR)
+        day_end = current_date.replace(hour=DAY_END_HOUR)
+        while slot_start < day_end:
+            yield slot_start
+            slot_start += step
+        current_date += timedelta(days=1)
+
+
+def is_scheduled(slot_start):
+    """Check whether a start time falls on the daily slot grid"""
+    if slot_start.second or slot_start.microsecond or slot_start.minute % SLOT_MINUTES:
+        return False
+    return DAY_START_HOUR <= slot_start.hour < DAY_END_HOUR
+
+
+def virtual_slot_id(slot_start):
+    """Deterministic id of the slot starting at the given time"""
+    return int((slot_start - SLOT_EPOCH).total_seconds()) // (SLOT_MINUTES * 60)
+
+
+def virtual_slot_start(slot_id):
+    """Start time for a virtual slot id, or None if it is not on the grid"""
+    try:
+        slot_start = SLOT_EPOCH + timedelta(minutes=int(slot_id) * SLOT_MINUTES)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return slot_start if is_scheduled(slot_start) else None
+
+
+def slot_event(slot_id, slot_start):
+    """Public description of a slot for availability events.
+
+    In virtual mode clients know slots by their computed id, which differs
+    from the row id of slots migrated from materialized mode.
+    """
+    if VIRTUAL_SLOTS:
+        slot_id = virtual_slot_id(slot_start)
+    return {
+        'id': slot_id,
+        'start_at': slot_start.isoformat(),
+        'end_at': (slot_start + timedelta(minutes=SLOT_MINUTES)).isoformat()
+    }
+
+
+def _insert_ignore_conflicts(conflict_target=('start_at',)):
+    """Build an INSERT for slots that skips rows violating a unique constraint"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(Slot).on_conflict_do_nothing(index_elements=conflict_target)
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(Slot).on_conflict_do_nothing(index_elements=conflict_target)
+    # Other backends: rely on the set difference plus the unique index
+    return insert(Slot)
+
+
+def materialize_slots(start_date, end_date):
+    """Insert every missing slot between two dates in one bulk statement.
+
+    Existing start times are loaded with a single range query on the unique
+    start_at index, and only the difference is inserted. Returns the number of
+    slots that were missing. The caller is responsible for committing.
+    """
+    wanted = list(iter_slot_starts(start_date, end_date))
+    if not wanted:
+        return 0
+
+    existing = set(db.session.execute(
+        db.select(Slot.start_at).where(
+            Slot.start_at >= wanted[0],
+            Slot.start_at <= wanted[-1]
+        )
+    ).scalars())
+
+    step = timedelta(minutes=SLOT_MINUTES)
+    missing = [
+        {'start_at': slot_start, 'end_at': slot_start + step}
+        for slot_start in wanted
+        if slot_start not in existing
+    ]
+    if missing:
+        db.session.execute(_insert_ignore_conflicts(), missing)
+
+    return len(missing)
+
+
+def booked_starts_query(start, end):
+    """Start times of the booked slots starting in [start, end)"""
+    return db.select(Slot.start_at).join(Booking).where(Slot.start_at >= start, Slot.start_at < end)
+
+
+def virtual_free_slot_starts(from_date, to_date):
+    """Start times of the free slots in a date range, from the booked ones only"""
+    last_start = to_date.replace(hour=DAY_END_HOUR, minute=0, second=0, microsecond=0)
+    # From the primary: listings built from this are cached under its version
+    booked = set(db.session.execute(booked_starts_query(from_date, last_start)).scalars())
+
+    return [slot_start for slot_start in iter_slot_starts(from_date, to_date) if slot_start not in booked]
+
+
+def virtual_free_slots(from_date, to_date):
+    """Compute the free slots in a date range without reading empty Slot rows.
+
+    Only booked start times are loaded; everything else on the schedule is
+    free. The dicts have the same shape as Slot.to_dict.
+    """
+    step = timedelta(minutes=SLOT_MINUTES)
+    return [
+        {
+            'id': virtual_slot_id(slot_start),
+            'start_at': slot_start.isoformat(),
+            'end_at': (slot_start + step).isoformat(),
+            'is_booked': False,
+            'created_at': None
+        }
+        for slot_start in virtual_free_slot_starts(from_date, to_date)
+    ]
+
+
+def slot_bit(slot_start):
+    """Position of a scheduled slot within its day, 0 for the first slot"""
+    return ((slot_start.hour - DAY_START_HOUR) * 60 + slot_start.minute) // SLOT_MINUTES
+
+
+def compact_listing(days):
+    """Free slots column by column from (date, free mask, slot ids) per day.
+
+    Bit i of a day's mask is the slot starting `day_start` + i * `slot_minutes`;
+    `ids` holds the free slots' ids in start order across all listed days.
+    Days without free slots are left out.
+    """
+    listing = {
+        'format': COMPACT_FORMAT,
+        'day_start': f'{DAY_START_HOUR:02d}:00',
+        'slot_minutes': SLOT_MINUTES,
+        'days': [],
+        'free': [],
+        'ids': []
+    }
+    for day, mask, ids in days:
+        if mask:
+            listing['days'].append(day.isoformat())
+            listing['free'].append(mask)
+            listing['ids'].extend(ids)
+    return listing
+
+
+def compact_from_rows(rows):
+    """compact_listing() from (slot id, start_at) rows ordered by start_at"""
+    days = []
+    for slot_id, slot_start in rows:
+        # The bitmasks only describe the daily grid, which is all the app creates
+        if not is_scheduled(slot_start):
+            continue
+        if not days or days[-1][0] != slot_start.date():
+            days.append((slot_start.date(), [0], []))
+        days[-1][1][0] |= 1 << slot_bit(slot_start)
+        days[-1][2].append(slot_id)
+    return compact_listing((day, mask[0], ids) for day, mask, ids in days)
+
+
+def get_or_create_virtual_slot(slot_id):
+    """Return the Slot row for a virtual slot id, creating it on first booking.
+
+    Rows migrated from materialized mode keep their original id, so lookups go
+    through start_at. Returns None if the id is not on the schedule.
+    """
+    slot_start = virtual_slot_start(slot_id)
+    if slot_start is None:
+        return None
+
+    slot = Slot.query.filter_by(start_at=slot_start).first()
+    if slot is None:
+        db.session.execute(_insert_ignore_conflicts(conflict_target=None), [{
+            'id': virtual_slot_id(slot_start),
+            'start_at': slot_start,
+            'end_at': slot_start + timedelta(minutes=SLOT_MINUTES)
+        }])
+        slot = Slot.query.filter_by(start_at=slot_start).first()
+    return slot
+
+
+def get_or_create_virtual_slots(slot_ids):
+    """Slot row ids for several virtual slot ids, in the same order.
+
+    Like get_or_create_virtual_slot, but existing rows are found with one
+    start_at IN query and the missing ones inserted in one statement, so a
+    batch costs at most three statements. None marks ids not on the schedule.
+    """
+    starts = [virtual_slot_start(slot_id) for slot_id in slot_ids]
+    wanted = {slot_start for slot_start in starts if slot_start is not None}
+    if not wanted:
+        return [None] * len(starts)
+
+    def row_ids(slot_starts):
+        return dict(db.session.execute(
+            db.select(Slot.start_at, Slot.id).where(Slot.start_at.in_(slot_starts))
+        ).all())
+
+    found = row_ids(wanted)
+    missing = sorted(wanted - found.keys())
+    if missing:
+        step = timedelta(minutes=SLOT_MINUTES)
+        db.session.execute(_insert_ignore_conflicts(conflict_target=None), [
+            {'id': virtual_slot_id(slot_start), 'start_at': slot_start, 'end_at': slot_start + step}
+            for slot_start in missing
+        ])
+        found.update(row_ids(missing))
+    return [found.get(slot_start) if slot_start is not None else None for slot_start in starts]
+
+
+def prune_unbooked_slots():
+    """Delete materialized Slot rows that have no booking.
+
+    Migration path to virtual mode: booked rows are kept (with their ids) so
+    existing bookings stay intact. Returns the number of rows deleted.
+    """
+    result = db.session.execute(
+        db.delete(Slot).where(~Slot.id.in_(db.select(Booking.slot_id)))
+    )
+    return result.rowcount
@@ -0,0 +1,39 @@
+import os
+import time
+
+# Print the startup stage timings when a worker finishes importing the app
+STARTUP_TIMING = os.environ.get('STARTUP_TIMING', '1') == '1'
+
+
+class StartupTimer:
+    """Records how long each stage of importing and building the app takes.
+
+    Import this module before anything heavy so the first stage includes
+    the Flask and SQLAlchemy imports.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.stages = {}
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = now - self._last
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def as_dict(self):
+        timings = {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+        timings['total'] = round(self.total() * 1000, 1)
+        return timings
+
+    def report(self):
+        if STARTUP_TIMING:
+            stages = ', '.join(f"{stage} {ms}ms" for stage, ms in self.as_dict().items())
+            print(f"Startup (pid {os.getpid()}): {stages}")
+
+
+startup_timer = StartupTimer()
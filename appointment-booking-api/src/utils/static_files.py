@@ -0,0 +1,163 @@
+import gzip
+import mimetypes
+import os
+import re
+import threading
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# max-age for static files whose names carry no content hash
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))
+# Files up to this size are held in memory; larger ones are streamed from disk
+STATIC_INLINE_MAX_BYTES = int(os.environ.get('STATIC_INLINE_MAX_BYTES', 1024 * 1024))
+# Rescan the static folder on every request (for `npm run build` during development)
+STATIC_MANIFEST_RELOAD = os.environ.get('STATIC_MANIFEST_RELOAD', '0') == '1'
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Vite names built assets like index-WqYOP75q.js: '-', an 8 character
+# base64url content hash, the extension. Eight lowercase letters are taken for
+# a word (site-manifest.json), not a hash; such a file just gets STATIC_MAX_AGE
+HASHED_NAME = re.compile(r'-(?![a-z]{8}\.)[A-Za-z0-9_-]{8}\.[a-z0-9]+$')
+
+# Precompressed variants, in order of preference: (content coding, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map', '.ico')
+
+
+class StaticFile:
+    """One file of the static folder with its headers and precompressed variants"""
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if name == 'index.html':
+            self.cache_control = 'no-cache'
+        elif name.startswith('assets/') and HASHED_NAME.search(name):
+            self.cache_control = IMMUTABLE
+        else:
+            self.cache_control = f'public, max-age={STATIC_MAX_AGE}'
+        self.body = self._read(self.path, self.size)
+
+        self.variants = {}
+        for coding, suffix in ENCODINGS:
+            variant_path = self.path + suffix
+            try:
+                variant_stat = os.stat(variant_path)
+            except OSError:
+                continue
+            # Ignore variants left over from an older build of the file
+            if variant_stat.st_mtime_ns < stat.st_mtime_ns:
+                continue
+            self.variants[coding] = (variant_path, variant_stat.st_size,
+                                     self._read(variant_path, variant_stat.st_size))
+
+    @staticmethod
+    def _read(path, size):
+        if size > STATIC_INLINE_MAX_BYTES:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _choose_encoding(self):
+        if not self.variants:
+            return None
+        accepted = request.accept_encodings
+        for coding, _ in ENCODINGS:
+            if coding in self.variants and accepted[coding] > 0:
+                return coding
+        return None
+
+    def response(self):
+        """Build a (possibly 304) response for the current request"""
+        coding = self._choose_encoding()
+        if coding is None:
+            path, size, body, etag = self.path, self.size, self.body, self.etag
+        else:
+            path, size, body = self.variants[coding]
+            etag = f'{self.etag}-{coding}'
+
+        if body is None:
+            body = wrap_file(request.environ, open(path, 'rb'))
+        response = Response(body, mimetype=self.mimetype, direct_passthrough=True)
+        response.content_length = size
+        response.set_etag(etag)
+        response.last_modified = self.mtime
+        response.headers['Cache-Control'] = self.cache_control
+        if coding is not None:
+            response.content_encoding = coding
+        if self.variants:
+            response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
+
+
+class StaticManifest:
+    """In-memory index of the static folder, built once so requests never stat files"""
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        files = {}
+        if self.root and os.path.isdir(self.root):
+            for directory, _, names in os.walk(self.root):
+                for filename in names:
+                    if filename.endswith(('.br', '.gz')):
+                        continue
+                    name = os.path.relpath(os.path.join(directory, filename), self.root).replace(os.sep, '/')
+                    try:
+                        files[name] = StaticFile(self.root, name)
+                    except OSError:
+                        continue
+        with self._lock:
+            self.files = files
+
+    def get(self, name):
+        if STATIC_MANIFEST_RELOAD:
+            self.reload()
+        return self.files.get(name)
+
+
+def compress_static(root, min_size=1024):
+    """Write .gz (and .br, when the brotli module is installed) next to text assets.
+
+    Skips files smaller than `min_size` and variants that are already newer
+    than their source. Returns the number of files written.
+    """
+    written = 0
+    for directory, _, names in os.walk(root):
+        for filename in names:
+            if not filename.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            if stat.st_size < min_size:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            compressors = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                compressors.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+            for suffix, compress in compressors:
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                    continue
+                compressed = compress(data)
+                if len(compressed) >= stat.st_size:
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                written += 1
+    return written
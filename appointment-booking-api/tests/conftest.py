@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Read when the app modules are imported: a throwaway database, no background
+# jobs or in-memory index (so the database paths are exercised) and fast hashing
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.update(
+    SLOT_INDEX_ENABLED='0', SLOT_SCHEDULER_ENABLED='0', ARCHIVE_ENABLED='0', RATE_LIMIT_ENABLED='0',
+    STARTUP_TIMING='0', REQUEST_LOG='0', PASSWORD_HASH_METHOD='pbkdf2:sha256:1000', PASSWORD_HASH_WORKERS='0'
+)
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app, init_database
+    with app.app_context():
+        assert init_database()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='module', params=['materialized', 'virtual'])
+def slot_mode(request, app):
+    """Run the requesting module's tests once per SLOT_MODE.
+
+    The mode is read at import, so VIRTUAL_SLOTS is switched in every app
+    module that imported it. Tests using this should keep each mode's data
+    apart, e.g. on different days.
+    """
+    patch = pytest.MonkeyPatch()
+    src_dir = os.path.abspath(SRC_DIR)
+    for module in list(sys.modules.values()):
+        if hasattr(module, 'VIRTUAL_SLOTS') and os.path.abspath(getattr(module, '__file__', None) or '').startswith(src_dir):
+            patch.setattr(module, 'VIRTUAL_SLOTS', request.param == 'virtual')
+    patch.setattr('utils.slots.SLOT_MODE', request.param)
+    yield request.param
+    patch.undo()
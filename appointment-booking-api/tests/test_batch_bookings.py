@@ -0,0 +1,58 @@
+"""Id handling of POST /api/book/batch and POST /api/cancel/batch."""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def patient(app, slot_mode):
+    from models.user import db, User
+    from routes.auth import generate_token
+    from utils.slots import materialize_slots
+
+    # Days of their own, apart from other test modules
+    offset = 20 if slot_mode == 'materialized' else 30
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=offset)
+    with app.app_context():
+        user = User(name='Batch Patient', email=f'batch-{slot_mode}@example.com', role='patient')
+        user.set_password('batch-test')
+        db.session.add(user)
+        if slot_mode == 'materialized':
+            materialize_slots(start, start)
+        db.session.commit()
+        auth = {'Authorization': f'Bearer {generate_token(user.id, user.role)}'}
+    free = [slot['id'] for slot in app.test_client().get(f'/api/slots?from={start:%Y-%m-%d}&to={start:%Y-%m-%d}').json]
+    return {'auth': auth, 'free': free}
+
+
+def test_book_batch_parses_ids_like_book(client, patient):
+    slot_id = patient['free'].pop()
+    response = client.post('/api/book/batch', json={'slotIds': [str(slot_id), True], 'mode': 'best_effort'},
+                           headers=patient['auth'])
+    statuses = [(result['status'], result.get('error', {}).get('code')) for result in response.json['results']]
+    assert statuses == [('booked', None), ('error', 'SLOT_NOT_FOUND')]
+
+
+@pytest.mark.parametrize('user_id', ['abc', True, None, [1]])
+def test_book_batch_rejects_invalid_user_id(client, patient, user_id):
+    response = client.post('/api/book/batch', json={'slotIds': [patient['free'][0]], 'userId': user_id},
+                           headers=patient['auth'])
+    assert response.status_code == 400
+    assert response.json['error']['code'] == 'INVALID_USER_ID'
+
+
+def test_cancel_batch_handles_repeated_ids_once(client, patient):
+    from utils.events import event_hub
+
+    booked = client.post('/api/book/batch', json={'slotIds': [patient['free'].pop()]}, headers=patient['auth'])
+    booking_id = booked.json['results'][0]['bookingId']
+    subscription = event_hub.subscribe()
+    try:
+        response = client.post('/api/cancel/batch', json={'bookingIds': [booking_id, str(booking_id), booking_id]},
+                               headers=patient['auth'])
+        freed = [event for event in list(subscription.queue) if event['type'] == 'freed']
+    finally:
+        event_hub.unsubscribe(subscription)
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == ['cancelled']
+    assert len(freed) == 1 and len(freed[0]['slots']) == 1
@@ -0,0 +1,54 @@
+"""/api/slots/stream as served by asgi.py, and its WSGI fallback."""
+import asyncio
+
+from utils import events
+from utils.events import EventHub, LocalBackend, asgi_event_stream
+
+
+def _run_stream(hub, publish_after=0.05, disconnect_after=None):
+    """Drive asgi_event_stream; returns (response start, body chunks)"""
+    sent = []
+
+    async def receive():
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    async def main():
+        stream = asyncio.create_task(asgi_event_stream({'type': 'http'}, receive, send, hub=hub))
+        await asyncio.sleep(publish_after)
+        # Published from another thread, as request handlers do
+        await asyncio.to_thread(hub.publish, {'type': 'booked', 'slots': []})
+        await asyncio.wait_for(stream, timeout=5)
+
+    asyncio.run(main())
+    return sent[0], [message['body'] for message in sent[1:]]
+
+
+def test_stream_delivers_events_and_closes_at_max_age(monkeypatch):
+    monkeypatch.setattr(events, 'SSE_MAX_AGE', 0.3)
+    hub = EventHub(LocalBackend())
+    start, chunks = _run_stream(hub)
+
+    assert start['status'] == 200
+    assert chunks[0].startswith(b'retry:')
+    assert any(b'event: booked' in chunk for chunk in chunks)
+    # Closed by the server so EventSource reconnects
+    assert chunks[-1] == b''
+    assert hub.subscriber_count() == 0
+
+
+def test_stream_unsubscribes_on_disconnect(monkeypatch):
+    monkeypatch.setattr(events, 'SSE_MAX_AGE', 30)
+    hub = EventHub(LocalBackend())
+    _run_stream(hub, disconnect_after=0.2)
+    assert hub.subscriber_count() == 0
+
+
+def test_wsgi_server_does_not_hold_streams(client):
+    assert client.get('/api/health').json['live_updates'] is False
+    assert client.get('/api/slots/stream').status_code == 204
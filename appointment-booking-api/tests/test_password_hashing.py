@@ -0,0 +1,42 @@
+"""Bounds on the password hashing pool (utils/passwords.py)."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import passwords
+from utils.passwords import HashingBusy
+
+
+def test_slot_is_held_until_a_timed_out_job_finishes(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(passwords, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setattr(passwords, 'PASSWORD_HASH_TIMEOUT', 0.05)
+    monkeypatch.setattr(passwords, '_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(passwords, '_get_pool', lambda: pool)
+    finish = threading.Event()
+
+    with pytest.raises(HashingBusy, match='timed out'):
+        passwords._run(finish.wait)
+    # The job still runs, so its slot is still taken
+    with pytest.raises(HashingBusy, match='in progress'):
+        passwords._run(finish.wait)
+
+    finish.set()
+    assert passwords._slots.acquire(timeout=1)
+    passwords._slots.release()
+    assert passwords._run(lambda: 'done') == 'done'
+    pool.shutdown()
+
+
+def test_busy_hashing_answers_503_with_retry_after(client, monkeypatch):
+    def refuse(fn, *args):
+        raise HashingBusy('Password hashing timed out')
+
+    monkeypatch.setattr(passwords, '_run', refuse)
+    response = client.post('/api/register', json={
+        'name': 'Busy Patient', 'email': 'busy@example.com', 'password': 'busy-test'
+    })
+    assert response.status_code == 503
+    assert response.json['error']['code'] == 'SERVER_BUSY'
+    assert response.headers['Retry-After'] == str(passwords.PASSWORD_HASH_RETRY_AFTER)
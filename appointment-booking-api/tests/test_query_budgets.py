@@ -0,0 +1,96 @@
+"""Each budgeted endpoint keeps to its statement budget (utils/query_budget.py).
+
+Every test runs in both slot modes. Caches are cleared before every measured
+request, so the counts are the worst case. A failure lists the statements the request ran, repeated ones
+(likely N+1) first.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.query_budget import assert_query_budget
+
+# Enough bookings that a per-row query would blow every listing's budget
+ROWS = 20
+
+
+@pytest.fixture(scope='module')
+def seeded(app, slot_mode):
+    from models.user import db, User
+    from routes.auth import generate_token
+    from utils.slots import materialize_slots
+
+    # Each mode books its own days
+    offset = 1 if slot_mode == 'materialized' else 10
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=offset)
+    with app.app_context():
+        admin = db.session.execute(db.select(User).where(User.role == 'admin')).scalar()
+        patient = User(name='Budget Patient', email=f'budget-{slot_mode}@example.com', role='patient')
+        patient.set_password('budget-test')
+        db.session.add(patient)
+        if slot_mode == 'materialized':
+            materialize_slots(start, start + timedelta(days=2))
+        db.session.commit()
+        patient_auth = {'Authorization': f'Bearer {generate_token(patient.id, patient.role)}'}
+        admin_auth = {'Authorization': f'Bearer {generate_token(admin.id, admin.role)}'}
+
+    client = app.test_client()
+    slots_path = f'/api/slots?from={start:%Y-%m-%d}&to={start + timedelta(days=2):%Y-%m-%d}'
+    free = [slot['id'] for slot in client.get(slots_path).json]
+    for slot_id in free[:ROWS]:
+        assert client.post('/api/book', json={'slotId': slot_id}, headers=patient_auth).status_code == 201
+    return {
+        'slots_path': slots_path,
+        'free': free[ROWS:],
+        'taken': free[0],
+        'patient_auth': patient_auth,
+        'admin_auth': admin_auth,
+    }
+
+
+@pytest.fixture(autouse=True)
+def cold_caches():
+    from utils.auth import user_cache
+    from utils.availability import slots_cache
+    user_cache.clear()
+    slots_cache.clear()
+
+
+def test_slot_listing(client, seeded):
+    response = assert_query_budget(client, 'GET', seeded['slots_path'])
+    assert response.status_code == 200
+
+
+def test_my_bookings(client, seeded):
+    response = assert_query_budget(client, 'GET', '/api/my-bookings', headers=seeded['patient_auth'])
+    assert len(response.json) >= ROWS
+
+
+def test_my_archived_bookings(client, seeded):
+    response = assert_query_budget(client, 'GET', '/api/my-bookings?archived=1', headers=seeded['patient_auth'])
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('query', ['', '?limit=10', '?archived=1&limit=10'])
+def test_all_bookings(client, seeded, query):
+    response = assert_query_budget(client, 'GET', f'/api/all-bookings{query}', headers=seeded['admin_auth'])
+    assert response.status_code == 200
+
+
+def test_book(client, seeded):
+    response = assert_query_budget(client, 'POST', '/api/book', json={'slotId': seeded['free'].pop()},
+                                   headers=seeded['patient_auth'])
+    assert response.status_code == 201
+
+
+def test_book_taken_slot(client, seeded):
+    response = assert_query_budget(client, 'POST', '/api/book', json={'slotId': seeded['taken']},
+                                   headers=seeded['patient_auth'])
+    assert response.status_code == 409
+
+
+def test_cancel(client, seeded):
+    booking_id = client.get('/api/my-bookings', headers=seeded['patient_auth']).json[0]['id']
+    response = assert_query_budget(client, 'DELETE', f'/api/cancel/{booking_id}', route='DELETE /api/cancel',
+                                   headers=seeded['admin_auth'])
+    assert response.status_code == 200
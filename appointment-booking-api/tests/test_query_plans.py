@@ -0,0 +1,8 @@
+"""The hot queries keep using indexes on the migrated schema (utils/query_plans.py)."""
+from utils.query_plans import check_query_plans
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        failures = check_query_plans()
+    assert failures == [], '\n'.join(f'FULL SCAN in {name}: {detail}' for name, detail in failures)
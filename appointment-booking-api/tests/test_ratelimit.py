@@ -0,0 +1,23 @@
+"""Token buckets in utils/ratelimit.py."""
+import pytest
+
+from utils.ratelimit import MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteBackend(str(tmp_path / 'ratelimit.db'))
+    return MemoryBackend()
+
+
+def test_refused_request_charges_no_bucket(backend):
+    ip, email = ('login:ip:1.2.3.4', 3, 60), ('login:email:a@example.com', 1, 60)
+
+    assert backend.take([ip, email]) == [0, 0]
+    waits = backend.take([ip, email])
+    assert waits[0] == 0 and waits[1] > 0
+    # Neither refusal above used up a token of the IP bucket
+    assert backend.take([ip]) == [0]
+    assert backend.take([ip]) == [0]
+    assert backend.take([ip])[0] > 0
@@ -0,0 +1,33 @@
+"""The materialized slot horizon (utils/scheduler.py)."""
+from datetime import datetime, timedelta
+
+from utils import scheduler
+from utils.query_budget import QueryCounter
+from utils.slots import iter_slot_starts
+
+
+def test_horizon_is_read_from_the_database(app, monkeypatch):
+    from models.user import Slot, db
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Past every day the other test modules use
+    far, farther = today + timedelta(days=200), today + timedelta(days=210)
+    per_day = len(list(iter_slot_starts(far, far)))
+    with app.app_context():
+        scheduler.ensure_materialized(far)
+
+        # A worker that did not materialize those days itself, e.g. after a restart
+        monkeypatch.setattr(scheduler, '_horizon', None)
+        with QueryCounter() as counter:
+            assert scheduler.ensure_materialized(far) == 0
+        assert len(counter) == 1
+        with QueryCounter() as counter:
+            assert scheduler.ensure_materialized(far) == 0
+        assert len(counter) == 0
+
+        # Days between the horizon and a later range are generated too
+        assert scheduler.ensure_materialized(farther) == 10 * per_day
+        count = db.session.execute(db.select(db.func.count(Slot.id)).where(
+            Slot.start_at >= far + timedelta(days=1), Slot.start_at < farther + timedelta(days=1)
+        )).scalar()
+        assert count == 10 * per_day
@@ -0,0 +1,24 @@
+"""Which built assets are served as immutable (utils/static_files.py)."""
+import pytest
+
+from utils.static_files import HASHED_NAME
+
+
+@pytest.mark.parametrize('name', [
+    'assets/index-WqYOP75q.js',
+    'assets/index-EtEswSwS.css',
+    'assets/vendor-a_b-C9x2.js',
+])
+def test_vite_hashed_names(name):
+    assert HASHED_NAME.search(name)
+
+
+@pytest.mark.parametrize('name', [
+    'assets/site-manifest.json',
+    'assets/logo-horizontal.svg',
+    'assets/logo.svg',
+    'assets/icon-dark.png',
+    'assets/index.WqYOP75q.js',
+])
+def test_plain_names(name):
+    assert not HASHED_NAME.search(name)
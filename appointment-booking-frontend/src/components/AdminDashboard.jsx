@@ -1,17 +1,29 @@
 import { useState, useEffect } from 'react'
 import { getApiUrl } from '../config/api'
 
+const PAGE_SIZE = 100
+
 const AdminDashboard = ({ user, onLogout }) => {
   const [bookings, setBookings] = useState([])
+  // Counts over all bookings, from the first page; `bookings` only holds
+  // the pages loaded so far
+  const [stats, setStats] = useState({ total: 0, patients: 0, days: 0 })
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState('')
 
-  const fetchAllBookings = async () => {
+  // Fetch the first page, or the page after `cursor` and append it
+  const fetchAllBookings = async (cursor = null) => {
     setLoading(true)
     try {
       const token = localStorage.getItem('token')
-      const response = await fetch(getApiUrl('/api/all-bookings'), {
+      const params = new URLSearchParams({ limit: PAGE_SIZE })
+      if (cursor) {
+        params.set('cursor', cursor)
+        params.set('include_total', '0')
+      }
+      const response = await fetch(getApiUrl(`/api/all-bookings?${params}`), {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -19,7 +31,11 @@ const AdminDashboard = ({ user, onLogout }) => {
       const data = await response.json()
       
       if (response.ok) {
-        setBookings(data)
+        setBookings(previous => cursor ? [...previous, ...data.bookings] : data.bookings)
+        setNextCursor(data.next_cursor)
+        if (!cursor) {
+          setStats({ total: data.total, patients: data.patients, days: data.days })
+        }
       } else {
         setError(data.error?.message || 'Failed to fetch bookings')
       }
@@ -138,7 +154,7 @@ const AdminDashboard = ({ user, onLogout }) => {
             <div className="flex items-center space-x-3">
               <span className="text-2xl">📅</span>
               <div>
-                <p className="text-2xl font-bold">{bookings.length}</p>
+                <p className="text-2xl font-bold">{stats.total}</p>
                 <p className="text-sm text-gray-600">Total Bookings</p>
               </div>
             </div>
@@ -148,7 +164,7 @@ const AdminDashboard = ({ user, onLogout }) => {
             <div className="flex items-center space-x-3">
               <span className="text-2xl">👥</span>
               <div>
-                <p className="text-2xl font-bold">{new Set(bookings.map(b => b.user_id)).size}</p>
+                <p className="text-2xl font-bold">{stats.patients}</p>
                 <p className="text-sm text-gray-600">Unique Patients</p>
               </div>
             </div>
@@ -158,7 +174,7 @@ const AdminDashboard = ({ user, onLogout }) => {
             <div className="flex items-center space-x-3">
               <span className="text-2xl">🕐</span>
               <div>
-                <p className="text-2xl font-bold">{Object.keys(groupedBookings).length}</p>
+                <p className="text-2xl font-bold">{stats.days}</p>
                 <p className="text-sm text-gray-600">Days with Bookings</p>
               </div>
             </div>
@@ -177,7 +193,7 @@ const AdminDashboard = ({ user, onLogout }) => {
             </p>
           </div>
           <div className="p-6">
-            {loading ? (
+            {loading && bookings.length === 0 ? (
               <div className="text-center py-8">
                 <p>Loading bookings...</p>
               </div>
@@ -226,6 +242,17 @@ const AdminDashboard = ({ user, onLogout }) => {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <div className="text-center">
+                    <button
+                      onClick={() => fetchAllBookings(nextCursor)}
+                      disabled={loading}
+                      className="px-4 py-2 border border-gray-300 rounded-md text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+                    >
+                      Load more
+                    </button>
+                  </div>
+                )}
               </div>
             )}
           </div>
@@ -1,12 +1,19 @@
-import { useState, useEffect } from 'react'
-import { getApiUrl } from '../config/api'
+import { useState, useEffect, useRef } from 'react'
+import { getApiUrl, newIdempotencyKey } from '../config/api'
+
+// How often the slot list is refreshed when the server has no event stream
+const SLOTS_POLL_INTERVAL_MS = 30000
 
 const PatientDashboard = ({ user, onLogout }) => {
   const [slots, setSlots] = useState([])
   const [bookings, setBookings] = useState([])
+  // Appointments older than the archive cutoff, loaded on request
+  const [archivedBookings, setArchivedBookings] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState('')
+  // Idempotency keys of bookings whose response never arrived, by slot id
+  const pendingBookingKeys = useRef({})
 
   const fetchSlots = async () => {
     try {
@@ -43,28 +50,99 @@ const PatientDashboard = ({ user, onLogout }) => {
     }
   }
 
+  const fetchArchivedBookings = async () => {
+    try {
+      const token = localStorage.getItem('token')
+      const response = await fetch(getApiUrl('/api/my-bookings?archived=1'), {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      })
+      const data = await response.json()
+
+      if (response.ok) {
+        setArchivedBookings(data)
+      } else {
+        setError(data.error?.message || 'Failed to fetch older appointments')
+      }
+    } catch (error) {
+      setError('Network error. Please try again.')
+    }
+  }
+
   useEffect(() => {
     fetchSlots()
     fetchBookings()
   }, [])
 
+  // Live availability: drop slots others book, refetch when slots are freed.
+  // Only servers that report live_updates hold streams without a thread
+  // each; elsewhere the listing is revalidated (ETag) on a timer instead.
+  useEffect(() => {
+    let events = null
+    let poll = null
+    let closed = false
+
+    const openStream = () => {
+      events = new EventSource(getApiUrl('/api/slots/stream'))
+      let opened = false
+      events.addEventListener('open', () => {
+        // Streams are closed by the server every few minutes; refetch after a
+        // reconnect for whatever happened in between
+        if (opened) fetchSlots()
+        opened = true
+      })
+      events.addEventListener('booked', (event) => {
+        const taken = new Set(JSON.parse(event.data).slots.map(slot => slot.id))
+        setSlots(current => current.filter(slot => !taken.has(slot.id)))
+      })
+      events.addEventListener('freed', () => fetchSlots())
+      events.addEventListener('resync', () => fetchSlots())
+    }
+
+    fetch(getApiUrl('/api/health'))
+      .then(response => response.json())
+      .then(health => {
+        if (closed) return
+        if (health.live_updates) {
+          openStream()
+        } else {
+          poll = setInterval(fetchSlots, SLOTS_POLL_INTERVAL_MS)
+        }
+      })
+      .catch(() => {})
+
+    return () => {
+      closed = true
+      if (events) events.close()
+      if (poll) clearInterval(poll)
+    }
+  }, [])
+
     const handleBookSlot = async (slotId) => {
     setLoading(true)
     setError('')
     setSuccess('')
 
+    // Retrying after a network error reuses the key, so a booking that did go
+    // through is returned instead of reported as taken
+    const idempotencyKey = pendingBookingKeys.current[slotId] || newIdempotencyKey()
+    pendingBookingKeys.current[slotId] = idempotencyKey
+
     try {
       const token = localStorage.getItem('token')
       const response = await fetch(getApiUrl('/api/book'), {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
+          'Authorization': `Bearer ${token}`,
+          'Idempotency-Key': idempotencyKey
         },
         body: JSON.stringify({ slotId })
       })
 
       const data = await response.json()
+      delete pendingBookingKeys.current[slotId]
 
       if (response.ok) {
         setSuccess('Slot booked successfully!')
@@ -250,6 +328,34 @@ const PatientDashboard = ({ user, onLogout }) => {
                     )
                   })
                 )}
+                {archivedBookings === null ? (
+                  <button
+                    onClick={fetchArchivedBookings}
+                    className="w-full py-2 text-sm text-blue-600 hover:underline"
+                  >
+                    Show older appointments
+                  </button>
+                ) : archivedBookings.length === 0 ? (
+                  <p className="text-gray-500 text-center text-sm py-2">No older appointments</p>
+                ) : (
+                  archivedBookings.map((booking) => {
+                    const { date, time } = formatDateTime(booking.slot_start)
+                    return (
+                      <div key={`archived-${booking.id}-${booking.slot_start}`} className="flex items-center justify-between p-3 border rounded-lg">
+                        <div className="flex items-center space-x-3">
+                          <span className="text-gray-400">🕐</span>
+                          <div>
+                            <p className="font-medium">{date}</p>
+                            <p className="text-sm text-gray-600">{time}</p>
+                          </div>
+                        </div>
+                        <span className="px-2 py-1 bg-gray-200 text-gray-700 rounded text-xs">
+                          Completed
+                        </span>
+                      </div>
+                    )
+                  })
+                )}
               </div>
             </div>
           </div>
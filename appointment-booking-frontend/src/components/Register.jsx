@@ -1,6 +1,6 @@
-import { useState } from 'react'
+import { useState, useRef } from 'react'
 import { Link } from 'react-router-dom'
-import { getApiUrl } from '../config/api'
+import { getApiUrl, newIdempotencyKey } from '../config/api'
 
 const Register = ({ onLogin }) => {
   const [formData, setFormData] = useState({
@@ -10,8 +10,12 @@ const Register = ({ onLogin }) => {
   })
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
+  // Kept until a response arrives so a retried submit is not registered twice
+  const idempotencyKey = useRef(null)
 
   const handleChange = (e) => {
+    // A changed form is a new request, not a retry
+    idempotencyKey.current = null
     setFormData({
       ...formData,
       [e.target.name]: e.target.value
@@ -23,16 +27,22 @@ const Register = ({ onLogin }) => {
     setLoading(true)
     setError('')
 
+    if (!idempotencyKey.current) {
+      idempotencyKey.current = newIdempotencyKey()
+    }
+
     try {
       const response = await fetch(getApiUrl('/api/register'), {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify(formData),
       })
 
       const data = await response.json()
+      idempotencyKey.current = null
 
       if (response.ok) {
         // Auto-login after successful registration
@@ -8,5 +8,14 @@ export const getApiUrl = (endpoint) => {
   return endpoint;
 };
 
+// Idempotency-Key for a POST that may be retried: reuse the same key when
+// retrying the same action so the server replays the first result
+export const newIdempotencyKey = () => {
+  if (window.crypto?.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
+
 // Export the base URL for direct use
 export { API_BASE_URL };
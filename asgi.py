@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.abspath(__file__))
+api_src_path = os.path.join(project_root, 'appointment-booking-api', 'src')
+
+# Add the API source directory to Python path
+if api_src_path not in sys.path:
+    sys.path.insert(0, api_src_path)
+
+# Requests run on a thread pool of this size; size the DB pool to match so
+# every thread can hold a connection without waiting on the pool
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+os.environ.setdefault('DB_POOL_SIZE', str(ASGI_THREADS))
+
+from a2wsgi import WSGIMiddleware
+from main import app as flask_app
+from utils.events import asgi_event_stream
+
+# ASGI entry point serving the same Flask app as wsgi.py, and what start.sh,
+# the Procfile and render.yaml run:
+#   uvicorn asgi:app --host 0.0.0.0 --port $PORT
+# Requests run on a thread pool of ASGI_THREADS. /api/slots/stream is served
+# on the event loop instead, so open dashboards do not take pool threads.
+wsgi_app = WSGIMiddleware(flask_app, workers=ASGI_THREADS)
+flask_app.config['ASYNC_EVENT_STREAMS'] = True
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == '/api/slots/stream':
+        await asgi_event_stream(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.environ.get('PORT', 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
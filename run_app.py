@@ -9,12 +9,11 @@ api_src_path = os.path.join(project_root, 'appointment-booking-api', 'src')
 # Add to Python path
 sys.path.insert(0, api_src_path)
 
-# Change working directory
-os.chdir(api_src_path)
-
 # Import and run the app
-from main import app
+from main import app, init_database
 
 if __name__ == "__main__":
+    with app.app_context():
+        init_database()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
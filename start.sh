@@ -1,7 +1,11 @@
 #!/bin/bash
+set -e
 
-# Navigate to the API directory
-cd appointment-booking-api/src
+# Run from the repository root: `flask --app wsgi` and uvicorn load the root
+# wsgi.py / asgi.py, which put appointment-booking-api/src on the import path
+cd "$(dirname "$0")"
 
-# Start the Flask application with gunicorn
-gunicorn wsgi:app --bind 0.0.0.0:${PORT:-5000}
+# Apply migrations and seed once, then serve the Flask application through asgi.py
+flask --app wsgi init-db
+flask --app wsgi compress-static
+uvicorn asgi:app --host 0.0.0.0 --port ${PORT:-5000}
@@ -9,16 +9,12 @@ api_src_path = os.path.join(project_root, 'appointment-booking-api', 'src')
 if api_src_path not in sys.path:
     sys.path.insert(0, api_src_path)
 
-# Change to the API directory to ensure relative paths work
-os.chdir(api_src_path)
-
 # Import the Flask app
 try:
     from main import app
     print(f"Successfully imported Flask app from {api_src_path}")
 except ImportError as e:
     print(f"Error importing main: {e}")
-    print(f"Current working directory: {os.getcwd()}")
     print(f"Python path: {sys.path}")
     raise
 